@@ -7,6 +7,7 @@ License: MIT
 Url: http://waldur.com
 Source0: %{name}-%{version}.tar.gz
 
+Requires: python-futures
 Requires: python-requests
 Requires: waldur-core >= 0.157.5
 
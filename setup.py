@@ -4,6 +4,7 @@ from setuptools import setup, find_packages
 install_requires = [
     'waldur-core>=0.157.5',
     'requests',
+    'futures; python_version < "3"',
 ]
 
 
@@ -19,6 +20,16 @@ setup(
     package_dir={'': 'src'},
     packages=find_packages('src', exclude=['*.tests', '*.tests.*', 'tests.*', 'tests']),
     install_requires=install_requires,
+    extras_require={
+        # Incremental parsing of large resource lists, C backend is used if yajl is installed.
+        'streaming': ['ijson'],
+        # Brotli content coding of API responses.
+        'brotli': ['brotli'],
+        # Faster JSON codec for decoding of API responses.
+        'fast-json': ['ujson'],
+        # OpenTelemetry spans of executor tasks, backend methods and API requests, and their export.
+        'tracing': ['opentelemetry-api', 'opentelemetry-sdk', 'opentelemetry-exporter-otlp-proto-http'],
+    },
     zip_safe=False,
     entry_points={
         'waldur_extensions': (
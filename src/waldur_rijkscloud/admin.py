@@ -52,6 +52,18 @@ class InstanceAdmin(structure_admin.VirtualMachineAdmin):
     pull = Pull()
 
 
+class SyncRunAdmin(admin.ModelAdmin):
+    list_filter = ('settings', 'succeeded')
+    list_display = ('settings', 'started', 'duration', 'succeeded', 'queries', 'requests',
+                    'created_rows', 'updated_rows', 'deleted_rows')
+    readonly_fields = ('uuid', 'settings', 'started', 'duration', 'succeeded', 'error_message', 'phases',
+                       'queries', 'requests', 'transferred_bytes', 'created_rows', 'updated_rows', 'deleted_rows')
+    date_hierarchy = 'started'
+
+    def has_add_permission(self, request):
+        return False
+
+
 admin.site.register(models.RijkscloudService, structure_admin.ServiceAdmin)
 admin.site.register(models.RijkscloudServiceProjectLink, structure_admin.ServiceProjectLinkAdmin)
 admin.site.register(models.Flavor, FlavorAdmin)
@@ -59,3 +71,4 @@ admin.site.register(models.FloatingIP, FloatingIPAdmin)
 admin.site.register(models.InternalIP, InternalIPAdmin)
 admin.site.register(models.Volume, VolumeAdmin)
 admin.site.register(models.Instance, InstanceAdmin)
+admin.site.register(models.SyncRun, SyncRunAdmin)
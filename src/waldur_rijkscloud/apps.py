@@ -9,6 +9,8 @@ class RijkscloudConfig(AppConfig):
     def ready(self):
         from waldur_core.structure import SupportedServices
 
+        from . import tracing
         from .backend import RijkscloudBackend
 
         SupportedServices.register_backend(RijkscloudBackend)
+        tracing.configure_exporter()
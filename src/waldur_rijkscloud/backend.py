@@ -1,8 +1,16 @@
 from __future__ import unicode_literals
 
+import collections
+import contextlib
+import datetime
+import functools
+import itertools
 import logging
+import threading
+import time
 
-from django.db import transaction
+from django.conf import settings as django_settings
+from django.db import close_old_connections, connection, transaction
 from django.utils import timezone
 import requests
 import six
@@ -11,17 +19,80 @@ from waldur_core.structure import log_backend_action, ServiceBackend, ServiceBac
 from waldur_core.structure.utils import (
     update_pulled_fields, handle_resource_not_found, handle_resource_update_success)
 
-from . import models
-from .client import RijkscloudClient
+from . import metrics, models, profiling, tracing
+from .cache import CatalogueCache, DjangoCacheStore, get_store
+from .circuitbreaker import get_circuit_breaker
+from .client import DEFAULT_BASE_URL, RetryPolicy, RijkscloudClient, bind_context, get_executor
+from .endpoints import parse_base_urls
+from .scheduler import SyncScheduler
+from .stats import SyncStats
+from .throttling import get_throttle
 
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of rows written or referenced by a single query.
+# SQLite does not accept more than 999 variables in a query.
+BULK_BATCH_SIZE = 500
+
+
+def _batches(items, size=BULK_BATCH_SIZE):
+    """
+    Split items into lists of given size consuming iterable lazily.
+    """
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, size))
+        if not batch:
+            return
+        yield batch
+
+
+def has_same_fields(resource, backend_resource, fields):
+    """
+    Return True if given backend fields of database row are equal to the ones of backend resource.
+    """
+    return all(getattr(resource, field) == getattr(backend_resource, field) for field in fields)
+
+
+def operation_deadline(setting='OPERATION_DEADLINE'):
+    """
+    Limit total duration of all API requests made by the decorated backend method,
+    including retries and requests made by nested operations or concurrently.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapped(self, *args, **kwargs):
+            with self.client.deadline(django_settings.WALDUR_RIJKSCLOUD[setting]):
+                return func(self, *args, **kwargs)
+        return wrapped
+    return decorator
+
 
 class RijkscloudBackendError(ServiceBackendError):
     pass
 
 
+class IPAddressIndex(object):
+    """
+    Index of internal and floating IP addresses of the service settings.
+    It is loaded with one query per model so that converting backend
+    instances does not issue queries per instance.
+    """
+
+    def __init__(self, settings):
+        self.internal_ips = self._get_index(models.InternalIP, settings)
+        self.floating_ips = self._get_index(models.FloatingIP, settings)
+
+    @staticmethod
+    def _get_index(model, settings):
+        index = {}
+        # The lowest primary key wins in order to match QuerySet.first() lookup.
+        for ip in model.objects.filter(settings=settings).order_by('pk'):
+            index.setdefault(ip.address, ip)
+        return index
+
+
 class RijkscloudBackend(ServiceBackend):
 
     def __init__(self, settings):
@@ -29,81 +100,420 @@ class RijkscloudBackend(ServiceBackend):
         :type settings: :class:`waldur_core.structure.models.ServiceSettings`
         """
         self.settings = settings
+        self.sync_timings = []
+        self.sync_stats = None
+        self._catalogue_cache = None
+        self._catalogue_locks = collections.defaultdict(threading.Lock)
+        self._catalogue_locks_lock = threading.Lock()
+        self.circuit_breaker = self.get_circuit_breaker(settings)
         self.client = RijkscloudClient(
             userid=settings.username,
             apikey=settings.token,
+            base_url=self.get_base_urls(settings),
+            throttle=self.get_throttle(settings),
+            circuit_breaker=self.circuit_breaker,
+            trace_attributes=self.get_trace_attributes(settings),
+            **self.get_client_options()
+        )
+        cache_options = django_settings.WALDUR_RIJKSCLOUD['CACHE']
+        self.catalogue = CatalogueCache(
+            store=get_store(cache_options),
+            namespace='rijkscloud:%s' % settings.uuid.hex,
+            ttls=cache_options['TTL'],
+            stale_ttl=cache_options['STALE_TTL'],
         )
+        tracing.instrument(self, attributes=self.get_trace_attributes(settings))
+        profiling.instrument(self, label=settings.uuid.hex)
+
+    @staticmethod
+    def get_client_options():
+        options = django_settings.WALDUR_RIJKSCLOUD
+        return dict(
+            pool_size=options['POOL_SIZE'],
+            keep_alive=options['KEEP_ALIVE'],
+            max_workers=options['MAX_WORKERS'],
+            conditional_requests=options['CONDITIONAL_REQUESTS'],
+            validators_size=options['CONDITIONAL_REQUESTS_CACHE_SIZE'],
+            streaming=options['STREAMING'],
+            chunk_size=options['CHUNK_SIZE'],
+            compression=options['COMPRESSION'],
+            metrics=metrics.registry if options['METRICS'] else None,
+            timeout=(options['CONNECT_TIMEOUT'], options['READ_TIMEOUT']),
+            retry_policy=RetryPolicy(
+                retries=options['RETRIES'],
+                backoff_factor=options['BACKOFF_FACTOR'],
+                max_backoff=options['MAX_BACKOFF'],
+            ),
+            failure_cooldown=options['ENDPOINTS']['FAILURE_COOLDOWN'],
+            exploration_rate=options['ENDPOINTS']['EXPLORATION_RATE'],
+        )
+
+    @staticmethod
+    def get_base_urls(settings):
+        """
+        Return backend URL of service settings, or the public API URL, followed by URLs of mirrors.
+        """
+        base_urls = parse_base_urls(settings.backend_url or DEFAULT_BASE_URL)
+        mirror_urls = parse_base_urls((settings.options or {}).get('mirror_urls') or '')
+        return base_urls + [url for url in mirror_urls if url not in base_urls]
+
+    @staticmethod
+    def get_trace_attributes(settings):
+        """
+        Return attributes of spans of backend methods and API requests, or None if tracing is disabled.
+        """
+        if not tracing.is_enabled():
+            return None
+        return {'waldur.settings.uuid': settings.uuid.hex}
+
+    @classmethod
+    def get_throttle(cls, settings):
+        options = django_settings.WALDUR_RIJKSCLOUD['THROTTLING']
+        return get_throttle(
+            '%s@%s' % (settings.username, ','.join(cls.get_base_urls(settings))),
+            rate=options['RATE'],
+            burst=options['BURST'],
+            max_concurrency=options['MAX_CONCURRENCY'],
+            min_concurrency=options['MIN_CONCURRENCY'],
+            latency_spike_ratio=options['LATENCY_SPIKE_RATIO'],
+        )
+
+    @staticmethod
+    def get_circuit_breaker(settings):
+        options = django_settings.WALDUR_RIJKSCLOUD['CIRCUIT_BREAKER']
+        if not options['FAILURE_THRESHOLD']:
+            return None
+
+        store = None
+        if options['STORE'] == 'django':
+            store = DjangoCacheStore(options['DJANGO_CACHE_ALIAS'])
+        return get_circuit_breaker(
+            'rijkscloud:circuit:%s' % settings.uuid.hex,
+            store=store,
+            failure_threshold=options['FAILURE_THRESHOLD'],
+            recovery_timeout=options['RECOVERY_TIMEOUT'],
+        )
+
+    def get_circuit_breaker_state(self):
+        """
+        Return state of circuit breaker of the service settings, or None if it is disabled.
+        """
+        if self.circuit_breaker is None:
+            return None
+        return self.circuit_breaker.get_state()
+
+    def _submit(self, method, *args, **kwargs):
+        """
+        Call method in a thread of the shared pool, database connection
+        of the thread is closed once the method returns.
+        """
+        method = bind_context(method)
+
+        def run():
+            close_old_connections()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                connection.close()
+
+        executor = get_executor(django_settings.WALDUR_RIJKSCLOUD['ASYNC_WORKERS'])
+        return executor.submit(run)
+
+    @contextlib.contextmanager
+    def catalogue_cache(self):
+        """
+        Within the context each catalogue endpoint, such as flavors or floating IPs,
+        is fetched from backend at most once. Nested contexts share the same cache
+        which is dropped when the outermost context exits.
+        """
+        if self._catalogue_cache is not None:
+            yield
+            return
+
+        self._catalogue_cache = {}
+        try:
+            yield
+        finally:
+            self._catalogue_cache = None
+
+    def _get_catalogue(self, name, fetch):
+        if self._catalogue_cache is None:
+            return fetch()
+
+        # Concurrent sync phases wait for the same catalogue instead of fetching it twice.
+        with self._catalogue_locks_lock:
+            lock = self._catalogue_locks[name]
+        with lock:
+            if name not in self._catalogue_cache:
+                self._catalogue_cache[name] = fetch()
+            return self._catalogue_cache[name]
+
+    def _list_flavors(self, allow_stale=False):
+        return self._get_catalogue('flavors', lambda: self.catalogue.get(
+            'flavors', self.client.list_flavors, allow_stale=allow_stale))
+
+    def _get_flavors_map(self, allow_stale=False):
+        return self._get_catalogue('flavors_map', lambda: {
+            flavor['name']: flavor for flavor in self._list_flavors(allow_stale)})
+
+    def get_endpoints_state(self):
+        """
+        Return average latency and health of API endpoints of the service settings.
+        """
+        return self.client.endpoints.get_state()
 
     def ping(self, raise_exception=False):
         try:
-            self.client.list_flavors()
+            # Credentials are checked against backend, so that cache is bypassed.
+            # While circuit breaker is open, it fails fast with error describing its state.
+            self._get_catalogue('flavors', self.client.list_flavors)
         except requests.RequestException as e:
+            logger.warning('Unable to ping Rijkscloud service settings %s: %s. Circuit breaker state: %s.',
+                           self.settings.uuid, e, self.get_circuit_breaker_state())
             if raise_exception:
                 six.reraise(RijkscloudBackendError, e)
             return False
         else:
             return True
 
+    @operation_deadline('SYNC_DEADLINE')
     def sync(self):
-        self.pull_flavors()
-        self.pull_floating_ips()
-        self.pull_networks()
-        self.pull_volumes()
-        self.pull_instances()
+        with self.catalogue_cache(), self.sync_run():
+            self._sync()
+
+    def _sync(self):
+        scheduler = SyncScheduler(max_workers=django_settings.WALDUR_RIJKSCLOUD['SYNC_WORKERS'])
+        phase = self._sync_phase
+        scheduler.add('flavors', phase(self.pull_flavors))
+        scheduler.add('floating_ips', phase(self.pull_floating_ips))
+        scheduler.add('networks', phase(self.pull_networks))
+        scheduler.add('volumes', phase(self.pull_volumes))
+        scheduler.add('instances', phase(self.pull_instances),
+                      dependencies=('flavors', 'floating_ips', 'networks'))
+        try:
+            scheduler.run()
+        finally:
+            self.sync_timings = scheduler.timings
+            logger.info('Rijkscloud sync of service settings %s: %s.', self.settings.uuid, ', '.join(
+                '%s started at %.3fs and took %.3fs' % timing for timing in scheduler.timings))
+
+    @contextlib.contextmanager
+    def sync_run(self):
+        """
+        Collect statistics of synchronization made within the context
+        and store them as SyncRun when the context exits.
+        """
+        if not django_settings.WALDUR_RIJKSCLOUD['SYNC_RUNS'] or self.sync_stats is not None:
+            yield
+            return
+
+        stats = self.sync_stats = SyncStats()
+        self.client.add_observer(stats)
+        started = timezone.now()
+        started_time = time.time()
+        error_message = None
+        try:
+            with stats.count_queries():
+                yield
+        except Exception as e:
+            error_message = six.text_type(e) or e.__class__.__name__
+            raise
+        finally:
+            self.client.remove_observer(stats)
+            self.sync_stats = None
+            self._save_sync_run(stats, started, time.time() - started_time, error_message)
+
+    def _save_sync_run(self, stats, started, duration, error_message):
+        try:
+            models.SyncRun.objects.create(
+                settings=self.settings,
+                started=started,
+                duration=duration,
+                succeeded=error_message is None,
+                error_message=error_message or '',
+                phases=[dict(timing._asdict()) for timing in self.sync_timings],
+                **stats.counters
+            )
+            retention = datetime.timedelta(days=django_settings.WALDUR_RIJKSCLOUD['SYNC_RUNS_RETENTION_DAYS'])
+            models.SyncRun.objects.filter(settings=self.settings, started__lt=started - retention).delete()
+        except Exception:
+            # Failure to store statistics should not hide result of synchronization.
+            logger.exception('Unable to save Rijkscloud sync run of service settings %s.', self.settings.uuid)
+
+    def _sync_phase(self, func):
+        """
+        Count queries of sync phase, it may run in a worker thread with its own database connection.
+        """
+        func = bind_context(func)
+        stats = self.sync_stats
+        if stats is None:
+            return func
+
+        @functools.wraps(func)
+        def wrapped():
+            with stats.count_queries():
+                return func()
+        return wrapped
+
+    def _count_rows(self, created=0, updated=0, deleted=0):
+        if self.sync_stats is not None:
+            self.sync_stats.add(created_rows=created, updated_rows=updated, deleted_rows=deleted)
 
     def _get_current_properties(self, model):
         return {p.backend_id: p for p in model.objects.filter(settings=self.settings)}
 
+    def _pull_properties(self, model, backend_properties):
+        """
+        Synchronize service properties of the model with backend properties.
+        Only fields returned by get_backend_fields are compared: new properties
+        are created in bulk, changed ones are updated by batches of identical
+        changes and stale ones are deleted, so that no write query is issued
+        if nothing has changed.
+
+        :param backend_properties: unsaved model instances built from backend data.
+        :return: current properties keyed by backend ID.
+        """
+        current_properties = self._get_current_properties(model)
+        fields = [field for field in model.get_backend_fields() if field != 'backend_id']
+        properties = {}
+        new_properties = []
+        changes_batches = collections.OrderedDict()
+
+        for backend_property in backend_properties:
+            backend_property.settings = self.settings
+            current_property = current_properties.pop(backend_property.backend_id, None)
+            if current_property is None:
+                new_properties.append(backend_property)
+                continue
+
+            properties[current_property.backend_id] = current_property
+            changes = {}
+            for field in fields:
+                value = getattr(backend_property, field)
+                if getattr(current_property, field) != value:
+                    changes[field] = value
+                    setattr(current_property, field, value)
+            if not changes:
+                continue
+
+            key = tuple(sorted(changes.items()))
+            try:
+                hash(key)
+            except TypeError:
+                key = current_property.pk
+            changes_batches.setdefault(key, (changes, []))[1].append(current_property.pk)
+
+        for changes, ids in changes_batches.values():
+            for batch in _batches(ids):
+                self._count_rows(updated=model.objects.filter(pk__in=batch).update(**changes))
+
+        stale_ids = [stale_property.pk for stale_property in current_properties.values()]
+        for batch in _batches(stale_ids):
+            self._count_rows(deleted=model.objects.filter(pk__in=batch).delete()[0])
+
+        if new_properties:
+            model.objects.bulk_create(new_properties, batch_size=BULK_BATCH_SIZE)
+            self._count_rows(created=len(new_properties))
+            # Primary keys of created rows are not available on all databases.
+            new_backend_ids = [new_property.backend_id for new_property in new_properties]
+            for batch in _batches(new_backend_ids):
+                for new_property in model.objects.filter(settings=self.settings, backend_id__in=batch):
+                    properties[new_property.backend_id] = new_property
+
+        return properties
+
     def _get_backend_resource(self, model, resources):
-        registered_backend_ids = model.objects.filter(
-            service_project_link__service__settings=self.settings).values_list('backend_id', flat=True)
+        registered_backend_ids = set(model.objects.filter(
+            service_project_link__service__settings=self.settings).values_list('backend_id', flat=True))
         return [instance for instance in resources if instance.backend_id not in registered_backend_ids]
 
+    @operation_deadline()
     def pull_flavors(self):
         try:
-            flavors = self.client.list_flavors()
+            flavors = self._list_flavors()
         except requests.RequestException as e:
             six.reraise(RijkscloudBackendError, e)
 
         with transaction.atomic():
-            cur_flavors = self._get_current_properties(models.Flavor)
-            for backend_flavor in flavors:
-                cur_flavors.pop(backend_flavor['name'], None)
-                models.Flavor.objects.update_or_create(
-                    settings=self.settings,
+            self._pull_properties(models.Flavor, [
+                models.Flavor(
                     backend_id=backend_flavor['name'],
-                    defaults={
-                        'name': backend_flavor['name'],
-                        'cores': backend_flavor['vcpus'],
-                        'ram': backend_flavor['ram'],
-                    })
-
-            models.Flavor.objects.filter(backend_id__in=cur_flavors.keys()).delete()
+                    name=backend_flavor['name'],
+                    cores=backend_flavor['vcpus'],
+                    ram=backend_flavor['ram'],
+                )
+                for backend_flavor in flavors
+            ])
 
+    @operation_deadline()
     def pull_volumes(self):
-        backend_volumes = self.get_volumes()
         volumes = models.Volume.objects.filter(
             service_project_link__service__settings=self.settings,
             state__in=[models.Volume.States.OK, models.Volume.States.ERRED]
         )
-        backend_volumes_map = {backend_volume.backend_id: backend_volume for backend_volume in backend_volumes}
-        for volume in volumes:
-            try:
-                backend_volume = backend_volumes_map[volume.backend_id]
-            except KeyError:
-                handle_resource_not_found(volume)
-            else:
-                update_pulled_fields(volume, backend_volume, models.Volume.get_backend_fields())
-                handle_resource_update_success(volume)
+        self._pull_resources(
+            volumes, self.iter_volumes(),
+            get_fields=lambda backend_volume: models.Volume.get_backend_fields(),
+        )
+
+    def _pull_resources(self, resources, backend_resources, get_fields):
+        """
+        Update resources from backend resources skipping healthy ones which
+        backend fields returned by get_fields already match backend resource.
+        Fingerprint is computed from the current database row rather than
+        stored, so that rows written by other paths are compared correctly.
+
+        Backend resources are consumed lazily by chunks of CHUNK_SIZE, each
+        chunk is reconciled with matching resources. Only backend IDs
+        are kept between chunks: once all backend resources are consumed,
+        resources missing in backend are marked as erred.
+        """
+        backend_ids = set()
+        for chunk in _batches(backend_resources, django_settings.WALDUR_RIJKSCLOUD['CHUNK_SIZE']):
+            backend_resources_map = {backend_resource.backend_id: backend_resource
+                                     for backend_resource in chunk}
+            backend_ids.update(backend_resources_map)
+            self._pull_resources_chunk(
+                resources.filter(backend_id__in=list(backend_resources_map)),
+                backend_resources_map, get_fields)
+
+        missing_ids = [pk for pk, backend_id in resources.values_list('pk', 'backend_id').iterator()
+                       if backend_id not in backend_ids]
+        for batch in _batches(missing_ids):
+            for resource in resources.filter(pk__in=batch):
+                handle_resource_not_found(resource)
+                self._count_rows(updated=1)
+
+    def _pull_resources_chunk(self, resources, backend_resources_map, get_fields):
+        for resource in resources:
+            backend_resource = backend_resources_map[resource.backend_id]
+            fields = get_fields(backend_resource)
+            is_healthy = resource.state == resource.States.OK and not resource.error_message
+            if is_healthy and has_same_fields(resource, backend_resource, fields):
+                continue
+
+            update_pulled_fields(resource, backend_resource, fields)
+            handle_resource_update_success(resource)
+            self._count_rows(updated=1)
 
     def get_volumes(self):
+        return list(self.iter_volumes())
+
+    def iter_volumes(self):
+        """
+        Yield unsaved volumes converted from backend volumes as soon as they are received.
+        """
         try:
-            backend_volumes = self.client.list_volumes()
+            for backend_volume in self.client.iter_volumes():
+                yield self._backend_volume_to_volume(backend_volume)
         except requests.RequestException as e:
             six.reraise(RijkscloudBackendError, e)
-        else:
-            return [self._backend_volume_to_volume(backend_volume)
-                    for backend_volume in backend_volumes]
+
+    def get_volumes_async(self):
+        """
+        Return future resolved with the same result as get_volumes.
+        """
+        return self._submit(self.get_volumes)
 
     def _backend_volume_to_volume(self, backend_volume):
         return models.Volume(
@@ -116,6 +526,7 @@ class RijkscloudBackend(ServiceBackend):
         )
 
     @log_backend_action()
+    @operation_deadline()
     def pull_volume(self, volume, update_fields=None):
         import_time = timezone.now()
         imported_volume = self.import_volume(volume.backend_id, save=False)
@@ -127,6 +538,7 @@ class RijkscloudBackend(ServiceBackend):
 
             update_pulled_fields(volume, imported_volume, update_fields)
 
+    @operation_deadline()
     def import_volume(self, backend_volume_id, save=True, service_project_link=None):
         try:
             backend_volume = self.client.get_volume(backend_volume_id)
@@ -144,6 +556,7 @@ class RijkscloudBackend(ServiceBackend):
         return self._get_backend_resource(models.Volume, self.get_volumes())
 
     @log_backend_action()
+    @operation_deadline()
     def pull_volume_runtime_state(self, volume):
         try:
             backend_volume = self.client.get_volume(volume.backend_id)
@@ -155,6 +568,7 @@ class RijkscloudBackend(ServiceBackend):
                 volume.save(update_fields=['runtime_state'])
 
     @log_backend_action()
+    @operation_deadline()
     def delete_volume(self, volume):
         try:
             self.client.delete_volume(volume.backend_id)
@@ -162,58 +576,70 @@ class RijkscloudBackend(ServiceBackend):
             six.reraise(RijkscloudBackendError, e)
 
     @log_backend_action('check is volume deleted')
+    @operation_deadline()
     def is_volume_deleted(self, instance):
         try:
             self.client.get_volume(instance.backend_id)
             return False
         except requests.RequestException as e:
-            if e.response.status_code == 404:
+            if e.response is not None and e.response.status_code == 404:
                 return True
             else:
                 six.reraise(RijkscloudBackendError, e)
 
+    @operation_deadline()
     def pull_instances(self):
-        backend_instances = self.get_instances()
         instances = models.Instance.objects.filter(
             service_project_link__service__settings=self.settings,
             state__in=[models.Instance.States.OK, models.Instance.States.ERRED],
         )
-        backend_instances_map = {backend_instance.backend_id: backend_instance
-                                 for backend_instance in backend_instances}
-        for instance in instances:
-            try:
-                backend_instance = backend_instances_map[instance.backend_id]
-            except KeyError:
-                handle_resource_not_found(instance)
-            else:
-                self.update_instance_fields(instance, backend_instance)
-                handle_resource_update_success(instance)
+        self._pull_resources(
+            instances, self.iter_instances(),
+            get_fields=self.get_instance_fields,
+        )
 
-    def update_instance_fields(self, instance, backend_instance):
+    def get_instance_fields(self, backend_instance):
         # Preserve flavor fields in Waldur database if flavor is deleted in Rijkscloud
         fields = set(models.Instance.get_backend_fields())
         flavor_fields = {'flavor_name', 'ram', 'cores'}
         if not backend_instance.flavor_name:
             fields = fields - flavor_fields
-        fields = list(fields)
+        return sorted(fields)
+
+    def get_instances(self, ip_index=None):
+        """
+        :param ip_index: IP address index of the service settings; it is built if not provided.
+        """
+        return list(self.iter_instances(ip_index))
 
-        update_pulled_fields(instance, backend_instance, fields)
+    def iter_instances(self, ip_index=None):
+        """
+        Yield unsaved instances converted from backend instances as soon as they are received.
 
-    def get_instances(self):
+        :param ip_index: IP address index of the service settings; it is built if not provided.
+        """
         try:
-            backend_instances = self.client.list_instances()
-            backend_flavors = self.client.list_flavors()
+            backend_flavors_map = self._get_flavors_map()
         except requests.RequestException as e:
             six.reraise(RijkscloudBackendError, e)
 
-        backend_flavors_map = {flavor['name']: flavor for flavor in backend_flavors}
-        instances = []
-        for backend_instance in backend_instances:
-            instance_flavor = backend_flavors_map.get(backend_instance['flavor'])
-            instances.append(self._backend_instance_to_instance(backend_instance, instance_flavor))
-        return instances
+        if ip_index is None:
+            ip_index = IPAddressIndex(self.settings)
 
-    def _backend_instance_to_instance(self, backend_instance, backend_flavor=None):
+        try:
+            for backend_instance in self.client.iter_instances():
+                instance_flavor = backend_flavors_map.get(backend_instance['flavor'])
+                yield self._backend_instance_to_instance(backend_instance, instance_flavor, ip_index)
+        except requests.RequestException as e:
+            six.reraise(RijkscloudBackendError, e)
+
+    def get_instances_async(self):
+        """
+        Return future resolved with the same result as get_instances.
+        """
+        return self._submit(self.get_instances)
+
+    def _backend_instance_to_instance(self, backend_instance, backend_flavor=None, ip_index=None):
         instance = models.Instance(
             name=backend_instance['name'],
             state=models.Instance.States.OK,
@@ -228,14 +654,20 @@ class RijkscloudBackend(ServiceBackend):
         # first item is internal IP address and second item is floating IP address.
         # This code does not handle case when internal subnet CIDR overlaps with other internal subnet.
         addresses = backend_instance['addresses']
-        instance.internal_ip = models.InternalIP.objects.filter(
-            settings=self.settings, address=addresses[0]).first()
-        if len(addresses) == 2:
-            instance.floating_ip = models.FloatingIP.objects.filter(
-                settings=self.settings, address=addresses[1]).first()
+        if ip_index is not None:
+            instance.internal_ip = ip_index.internal_ips.get(addresses[0])
+            if len(addresses) == 2:
+                instance.floating_ip = ip_index.floating_ips.get(addresses[1])
+        else:
+            instance.internal_ip = models.InternalIP.objects.filter(
+                settings=self.settings, address=addresses[0]).first()
+            if len(addresses) == 2:
+                instance.floating_ip = models.FloatingIP.objects.filter(
+                    settings=self.settings, address=addresses[1]).first()
         return instance
 
     @log_backend_action()
+    @operation_deadline()
     def pull_instance(self, instance, update_fields=None):
         import_time = timezone.now()
         imported_instance = self.import_instance(instance.backend_id, save=False)
@@ -246,14 +678,15 @@ class RijkscloudBackend(ServiceBackend):
                 update_fields = models.Instance.get_backend_fields()
             update_pulled_fields(instance, imported_instance, update_fields)
 
-    def import_instance(self, backend_instance_id, save=True, service_project_link=None):
+    @operation_deadline()
+    def import_instance(self, backend_instance_id, save=True, service_project_link=None, ip_index=None):
         try:
             backend_instance = self.client.get_instance(backend_instance_id)
-            flavor = self.client.get_flavor(backend_instance['flavor'])
+            flavor = self._get_flavors_map(allow_stale=True).get(backend_instance['flavor'])
         except requests.RequestException as e:
             six.reraise(RijkscloudBackendError, e)
 
-        instance = self._backend_instance_to_instance(backend_instance, flavor)
+        instance = self._backend_instance_to_instance(backend_instance, flavor, ip_index)
         if service_project_link:
             instance.service_project_link = service_project_link
         if save:
@@ -264,6 +697,7 @@ class RijkscloudBackend(ServiceBackend):
         return self._get_backend_resource(models.Instance, self.get_instances())
 
     @log_backend_action()
+    @operation_deadline()
     def create_volume(self, volume):
         kwargs = {
             'size': max(1, int(volume.size / 1024)),
@@ -282,6 +716,7 @@ class RijkscloudBackend(ServiceBackend):
         return volume
 
     @log_backend_action()
+    @operation_deadline()
     def create_instance(self, instance):
         # It's impossible to specify custom security group
         # because Rijkscloud API does not provide security groups API yet.
@@ -310,76 +745,98 @@ class RijkscloudBackend(ServiceBackend):
             self.client.create_instance(kwargs)
         except requests.RequestException as e:
             six.reraise(RijkscloudBackendError, e)
+        finally:
+            self._invalidate_floating_ips()
 
         instance.backend_id = instance.name
         instance.save()
         return instance
 
     @log_backend_action()
+    @operation_deadline()
     def delete_instance(self, instance):
         try:
             self.client.delete_instance(instance.backend_id)
         except requests.RequestException as e:
             six.reraise(RijkscloudBackendError, e)
+        finally:
+            self._invalidate_floating_ips()
+
+    def _invalidate_floating_ips(self):
+        # Availability of floating IPs changes when instance is created or deleted.
+        self.catalogue.invalidate('floating_ips')
 
     @log_backend_action('check is instance deleted')
+    @operation_deadline()
     def is_instance_deleted(self, instance):
         try:
             self.client.get_instance(instance.backend_id)
             return False
         except requests.RequestException as e:
-            if e.response.status_code == 404:
+            if e.response is not None and e.response.status_code == 404:
                 return True
             else:
                 six.reraise(RijkscloudBackendError, e)
 
+    @operation_deadline()
     def pull_floating_ips(self):
         try:
-            backend_floating_ips = self.client.list_floatingips()
+            backend_floating_ips = self._get_catalogue('floating_ips', lambda: self.catalogue.get(
+                'floating_ips', self.client.list_floatingips))
         except requests.RequestException as e:
             six.reraise(RijkscloudBackendError, e)
             return
 
         with transaction.atomic():
-            cur_floating_ips = self._get_current_properties(models.FloatingIP)
-            for backend_fip in backend_floating_ips:
-                cur_floating_ips.pop(backend_fip['float_ip'], None)
-                models.FloatingIP.objects.update_or_create(
-                    settings=self.settings,
+            self._pull_properties(models.FloatingIP, [
+                models.FloatingIP(
                     backend_id=backend_fip['float_ip'],
-                    defaults={
-                        'address': backend_fip['float_ip'],
-                        'is_available': backend_fip['available'],
-                    })
+                    address=backend_fip['float_ip'],
+                    is_available=backend_fip['available'],
+                )
+                for backend_fip in backend_floating_ips
+            ])
+
+    def list_networks(self):
+        try:
+            return self.client.list_networks()
+        except requests.RequestException as e:
+            six.reraise(RijkscloudBackendError, e)
 
-            models.FloatingIP.objects.filter(backend_id__in=cur_floating_ips.keys()).delete()
+    def list_networks_async(self):
+        """
+        Return future resolved with the same result as list_networks.
+        """
+        return self._submit(self.list_networks)
 
+    @operation_deadline()
     def pull_networks(self):
         try:
-            backend_networks = self.client.list_networks()
+            network_names = self.client.list_network_names()
         except requests.RequestException as e:
             six.reraise(RijkscloudBackendError, e)
-            return
 
         with transaction.atomic():
-            current_networks = self._get_current_properties(models.Network)
-            for backend_network in backend_networks:
-                current_networks.pop(backend_network['name'], None)
-                network, _ = models.Network.objects.update_or_create(
-                    settings=self.settings,
-                    backend_id=backend_network['name'],
-                    defaults=dict(name=backend_network['name']),
-                )
-                self.pull_subnets(network, backend_network['subnets'])
+            networks = self._pull_properties(models.Network, [
+                models.Network(backend_id=network_name, name=network_name)
+                for network_name in network_names
+            ])
 
-            models.Network.objects.filter(backend_id__in=current_networks.keys()).delete()
+        # Subnets are stored as soon as they are fetched instead of
+        # waiting until the whole network tree is loaded.
+        try:
+            for network_name, backend_subnet in self.client.iter_subnets(network_names):
+                with transaction.atomic():
+                    self.pull_subnets(networks[network_name], [backend_subnet])
+        except requests.RequestException as e:
+            six.reraise(RijkscloudBackendError, e)
 
     def pull_subnets(self, network, backend_subnets):
         for backend_subnet in backend_subnets:
             gateway_ip = backend_subnet['gateway_ip']
             if isinstance(gateway_ip, list):
                 gateway_ip = gateway_ip[0]
-            subnet, _ = models.SubNet.objects.update_or_create(
+            subnet, created = models.SubNet.objects.update_or_create(
                 settings=self.settings,
                 network=network,
                 backend_id=backend_subnet['name'],
@@ -391,17 +848,49 @@ class RijkscloudBackend(ServiceBackend):
                     dns_nameservers=backend_subnet['dns_nameservers'],
                 )
             )
+            self._count_rows(created=int(created), updated=int(not created))
             self.pull_internal_ips(subnet, backend_subnet['ips'])
 
     def pull_internal_ips(self, subnet, internal_ips):
-        for internal_ip in internal_ips:
-            models.InternalIP.objects.update_or_create(
+        """
+        Reconcile IP addresses of the subnet using constant number of queries
+        regardless of subnet size: new addresses are inserted in bulk,
+        availability of existing ones is updated in bulk and vanished
+        addresses which are not used by any instance are deleted.
+        """
+        backend_ips = collections.OrderedDict(
+            (internal_ip['ip'], bool(internal_ip['available'])) for internal_ip in internal_ips)
+        current_ips = {ip.backend_id: ip for ip in models.InternalIP.objects.filter(
+            settings=self.settings, subnet=subnet).only('pk', 'backend_id', 'is_available')}
+
+        new_ips = [
+            models.InternalIP(
                 settings=self.settings,
                 subnet=subnet,
-                backend_id=internal_ip['ip'],
-                defaults={
-                    'name': internal_ip['ip'],
-                    'address': internal_ip['ip'],
-                    'is_available': internal_ip['available'],
-                }
+                backend_id=address,
+                name=address,
+                address=address,
+                is_available=is_available,
             )
+            for address, is_available in backend_ips.items()
+            if address not in current_ips
+        ]
+        if new_ips:
+            models.InternalIP.objects.bulk_create(new_ips, batch_size=BULK_BATCH_SIZE)
+            self._count_rows(created=len(new_ips))
+
+        changed_ids = {True: [], False: []}
+        stale_ids = []
+        for address, ip in current_ips.items():
+            if address not in backend_ips:
+                stale_ids.append(ip.pk)
+            elif ip.is_available != backend_ips[address]:
+                changed_ids[backend_ips[address]].append(ip.pk)
+
+        for is_available, ids in changed_ids.items():
+            for batch in _batches(ids):
+                self._count_rows(updated=models.InternalIP.objects.filter(pk__in=batch).update(
+                    is_available=is_available))
+
+        for batch in _batches(stale_ids):
+            self._count_rows(deleted=models.InternalIP.objects.filter(pk__in=batch, instance__isnull=True).delete()[0])
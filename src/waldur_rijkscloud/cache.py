@@ -0,0 +1,148 @@
+from __future__ import unicode_literals
+
+import collections
+import logging
+import threading
+import time
+
+from django.core.cache import caches
+
+from .client import get_executor
+
+logger = logging.getLogger(__name__)
+
+
+class LocMemStore(object):
+    """
+    In-process store with bounded size, the least recently used entry is evicted first.
+    """
+
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires < time.time():
+                return None
+            self._entries[key] = entry
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.time() + timeout)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class DjangoCacheStore(object):
+    """
+    Store backed by Django cache, so that entries are shared by all worker processes.
+    Size and eviction policy are defined by the Django cache backend.
+    """
+
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, timeout):
+        self.cache.set(key, value, timeout)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(options):
+    """
+    Return store shared by all catalogue caches of the process.
+    """
+    if options['STORE'] == 'django':
+        return DjangoCacheStore(options['DJANGO_CACHE_ALIAS'])
+
+    with _stores_lock:
+        store = _stores.get(options['MAX_SIZE'])
+        if store is None:
+            store = _stores[options['MAX_SIZE']] = LocMemStore(options['MAX_SIZE'])
+        return store
+
+
+class CatalogueCache(object):
+    """
+    Cache for rarely changing catalogue endpoints, such as flavors or floating IPs.
+
+    Entry is fresh during TTL of its endpoint, endpoint with zero TTL is not cached.
+    Callers which tolerate slightly outdated data may get entry which is stale for
+    less than stale_ttl seconds; in this case entry is refreshed in background.
+    """
+
+    _refreshing = set()
+    _refreshing_lock = threading.Lock()
+
+    def __init__(self, store, namespace, ttls, stale_ttl=0):
+        self.store = store
+        self.namespace = namespace
+        self.ttls = ttls
+        self.stale_ttl = stale_ttl
+
+    def _get_key(self, endpoint):
+        return '%s:%s' % (self.namespace, endpoint)
+
+    def get(self, endpoint, fetch, allow_stale=False):
+        ttl = self.ttls.get(endpoint, 0)
+        if not ttl:
+            return fetch()
+
+        key = self._get_key(endpoint)
+        entry = self.store.get(key)
+        if entry is not None:
+            value, fetched = entry
+            age = time.time() - fetched
+            if age < ttl:
+                return value
+            if allow_stale and age < ttl + self.stale_ttl:
+                self._refresh(key, ttl, fetch)
+                return value
+
+        return self._fetch(key, ttl, fetch)
+
+    def invalidate(self, *endpoints):
+        for endpoint in endpoints:
+            self.store.delete(self._get_key(endpoint))
+
+    def _fetch(self, key, ttl, fetch):
+        value = fetch()
+        self.store.set(key, (value, time.time()), ttl + self.stale_ttl)
+        return value
+
+    def _refresh(self, key, ttl, fetch):
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._fetch(key, ttl, fetch)
+            except Exception:
+                logger.exception('Unable to refresh Rijkscloud catalogue cache entry %s.', key)
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+
+        get_executor().submit(refresh)
@@ -0,0 +1,131 @@
+from __future__ import unicode_literals
+
+import logging
+import threading
+import time
+
+import requests
+
+from .cache import LocMemStore
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(requests.RequestException):
+    pass
+
+
+class CircuitBreaker(object):
+    """
+    Fail fast while API of the service settings is unavailable.
+
+    Circuit is opened after failure_threshold consecutive failed requests and
+    requests fail with CircuitOpenError without reaching API. After
+    recovery_timeout seconds circuit becomes half-open: one probe request is
+    let through, circuit is closed if it succeeds and opened again otherwise.
+
+    State is kept in store, so that breaker is shared by worker processes if
+    store is backed by Django cache. Concurrent updates from different
+    processes are not atomic, therefore thresholds are approximate.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    # Number of seconds state is kept in store after the last failure.
+    STATE_TTL = 24 * 60 * 60
+
+    def __init__(self, key, store=None, failure_threshold=5, recovery_timeout=30):
+        self.key = key
+        self.store = store or LocMemStore()
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+
+    def _get(self):
+        return self.store.get(self.key) or {'failures': 0, 'opened': None, 'probe': None}
+
+    def _set(self, state):
+        self.store.set(self.key, state, self.STATE_TTL)
+
+    def _get_state(self, state, now):
+        if state['opened'] is None:
+            return self.CLOSED
+        if now - state['opened'] < self.recovery_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def get_state(self):
+        """
+        Return dict with current state, number of consecutive failures and
+        number of seconds left until circuit becomes half-open.
+        """
+        now = time.time()
+        state = self._get()
+        current = self._get_state(state, now)
+        retry_after = state['opened'] + self.recovery_timeout - now if current == self.OPEN else 0
+        return {
+            'state': current,
+            'failures': state['failures'],
+            'retry_after': max(0, retry_after),
+        }
+
+    def before_request(self):
+        """
+        Raise CircuitOpenError if request is not allowed.
+        """
+        with self._lock:
+            now = time.time()
+            state = self._get()
+            current = self._get_state(state, now)
+            if current == self.CLOSED:
+                return
+            if current == self.HALF_OPEN:
+                # Only one probe is let through, it is considered lost after recovery timeout.
+                if state['probe'] is None or now - state['probe'] >= self.recovery_timeout:
+                    state['probe'] = now
+                    self._set(state)
+                    return
+            retry_after = max(0, state['opened'] + self.recovery_timeout - now)
+            raise CircuitOpenError(
+                'Circuit breaker is %s after %s consecutive failures, '
+                'Rijkscloud API requests are suspended for %.0f seconds.' % (
+                    current, state['failures'], retry_after or self.recovery_timeout))
+
+    def record(self, success):
+        """
+        Report outcome of request allowed by before_request.
+        """
+        with self._lock:
+            state = self._get()
+            if success:
+                if state['failures'] or state['opened'] is not None:
+                    if state['opened'] is not None:
+                        logger.info('Circuit breaker %s is closed.', self.key)
+                    self.store.delete(self.key)
+                return
+
+            now = time.time()
+            state['failures'] += 1
+            is_probe = self._get_state(state, now) == self.HALF_OPEN
+            if is_probe or state['opened'] is None and state['failures'] >= self.failure_threshold:
+                logger.warning('Circuit breaker %s is open after %s consecutive failures.',
+                               self.key, state['failures'])
+                state['opened'] = now
+                state['probe'] = None
+            self._set(state)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(key, store=None, **options):
+    """
+    Return circuit breaker shared by all threads of the process for the given key.
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker(key, store, **options)
+        return breaker
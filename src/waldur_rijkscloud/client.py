@@ -1,6 +1,279 @@
+import collections
+from concurrent import futures
+import contextlib
+import copy
+import email.utils
+import functools
+import importlib
+import itertools
 import json
+import random
+import threading
+import time
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.exceptions import DecodeError, ProtocolError, ReadTimeoutError
+from requests.packages.urllib3.util import make_headers
+
+from . import tracing
+from .endpoints import get_endpoint_pool, is_connect_error
+from .metrics import get_endpoint_template
+
+DEFAULT_BASE_URL = 'https://api.ix.rijkscloud.nl'
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MAX_WORKERS = 1
+DEFAULT_ASYNC_WORKERS = 20
+DEFAULT_VALIDATORS_SIZE = 10000
+# Connect and read timeouts in seconds.
+DEFAULT_TIMEOUT = (10, 60)
+# Number of listed resources which details are fetched and processed at once.
+DEFAULT_CHUNK_SIZE = 100
+
+
+def _import_ijson():
+    """
+    Return the fastest available backend of optional ijson incremental JSON parser.
+    """
+    for name in ('ijson.backends.yajl2_c', 'ijson.backends.yajl2_cffi', 'ijson.backends.python'):
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            continue
+
+
+ijson = _import_ijson()
+
+# Errors raised while streamed response body is read and parsed.
+STREAM_ERRORS = (DecodeError, ProtocolError, ReadTimeoutError)
+if ijson is not None:
+    from ijson.common import IncompleteJSONError
+    STREAM_ERRORS += (IncompleteJSONError,)
+
+
+def _import_json_codec():
+    """
+    Return the fastest available JSON codec, standard library one is used by default.
+    """
+    for name in ('orjson', 'ujson', 'simplejson'):
+        try:
+            return importlib.import_module(name)
+        except ImportError:
+            continue
+    return json
+
+
+json_codec = _import_json_codec()
+
+
+def loads(content):
+    return json_codec.loads(content)
+
+
+def dumps(data):
+    return json_codec.dumps(data)
+
+
+# Content codings which are decoded by urllib3, brotli is included if it is installed.
+ACCEPT_ENCODING = make_headers(accept_encoding=True)['accept-encoding']
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+_validators = {}
+_validators_lock = threading.Lock()
+
+
+def get_session(key, pool_size=DEFAULT_POOL_SIZE):
+    """
+    Return HTTP session shared by all clients with the same key within current process.
+    Session keeps up to pool_size idle connections open so that consecutive
+    requests do not pay for TCP and TLS handshake again.
+    """
+    key = (key, pool_size)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[key] = session
+        return session
+
+
+def close_sessions():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+def get_executor(max_workers=DEFAULT_ASYNC_WORKERS):
+    """
+    Return thread pool shared by all asynchronous calls within current process.
+    It allows to query many Rijkscloud accounts concurrently while number of
+    threads stays bounded regardless of number of accounts.
+    """
+    with _executors_lock:
+        executor = _executors.get(max_workers)
+        if executor is None:
+            executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+            _executors[max_workers] = executor
+        return executor
+
+
+class ValidatorsStore(object):
+    """
+    Bounded store of response validators (ETag and Last-Modified) together
+    with the parsed response body, the least recently used URL is evicted first.
+    """
+    Entry = collections.namedtuple('Entry', ('etag', 'last_modified', 'data'))
+
+    def __init__(self, max_size=DEFAULT_VALIDATORS_SIZE):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._entries[key] = entry
+            return entry
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+def iter_json_items(stream, prefix):
+    """
+    Parse JSON document from file-like stream incrementally and yield items of the array at prefix.
+    """
+    try:
+        return ijson.items(stream, prefix, use_float=True)
+    except TypeError:
+        # Older versions of ijson decode all numbers with fraction as Decimal.
+        return ijson.items(stream, prefix)
+
+
+def convert_stream_error(error, response):
+    """
+    Return requests exception equivalent to error raised while streamed response
+    body is read, as raw urllib3 and ijson errors are not RequestException.
+    Incomplete JSON document means that connection was closed before the body was received.
+    """
+    if isinstance(error, ReadTimeoutError):
+        return requests.ReadTimeout(error, response=response)
+    if isinstance(error, DecodeError):
+        return requests.ContentDecodingError(error, response=response)
+    return requests.ConnectionError(error, response=response)
+
+
+def get_validators_store(max_size=DEFAULT_VALIDATORS_SIZE):
+    with _validators_lock:
+        store = _validators.get(max_size)
+        if store is None:
+            store = _validators[max_size] = ValidatorsStore(max_size)
+        return store
+
+
+class DeadlineExceeded(requests.Timeout):
+    pass
+
+
+# Deadline is kept per thread, so that concurrent operations do not shorten or extend each other's deadline.
+_deadlines = threading.local()
+
+
+def get_deadline():
+    """
+    Return timestamp of deadline of the current thread, or None if there is no deadline.
+    """
+    return getattr(_deadlines, 'value', None)
+
+
+@contextlib.contextmanager
+def _set_deadline(deadline):
+    previous = get_deadline()
+    _deadlines.value = deadline
+    try:
+        yield
+    finally:
+        _deadlines.value = previous
+
+
+def bind_context(func):
+    """
+    Bind func to the deadline and trace context of the caller, so that
+    they apply to requests made by func in a worker thread.
+    """
+    func = tracing.bind(func)
+    deadline = get_deadline()
+    if deadline is None:
+        return func
+
+    @functools.wraps(func)
+    def wrapped(*args, **kwargs):
+        with _set_deadline(deadline):
+            return func(*args, **kwargs)
+
+    return wrapped
+
+
+class RetryPolicy(object):
+    """
+    Retry idempotent requests failed because of connection errors, timeouts
+    or temporary unavailability of API, with jittered exponential backoff.
+    """
+    methods = ('get', 'delete')
+    statuses = (429, 502, 503, 504)
+
+    def __init__(self, retries=0, backoff_factor=0.5, max_backoff=10):
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+
+    def get_delay(self, attempt, response=None):
+        """
+        Return jittered backoff delay, which is not shorter than Retry-After of the response.
+        """
+        # Full jitter spreads retries of concurrent clients.
+        delay = random.uniform(0, min(self.max_backoff, self.backoff_factor * 2 ** attempt))
+        if response is not None:
+            delay = max(delay, self.get_retry_after(response))
+        return delay
+
+    @staticmethod
+    def get_retry_after(response):
+        """
+        Return number of seconds from Retry-After header, which is either delay or HTTP date.
+        """
+        value = response.headers.get('Retry-After')
+        if not value:
+            return 0
+        try:
+            return max(0, float(value))
+        except ValueError:
+            pass
+        date = email.utils.parsedate_tz(value)
+        if date is None:
+            return 0
+        return max(0, email.utils.mktime_tz(date) - time.time())
+
+    def can_retry(self, method, attempt):
+        return method in self.methods and attempt < self.retries
 
 
 class RijkscloudClient(object):
@@ -8,41 +281,316 @@ class RijkscloudClient(object):
     Rijkscloud Python client.
     """
 
-    def __init__(self, apikey, userid):
-        self.base_url = 'https://api.ix.rijkscloud.nl'
+    def __init__(self, apikey, userid, base_url=DEFAULT_BASE_URL,
+                 pool_size=DEFAULT_POOL_SIZE, keep_alive=True, max_workers=DEFAULT_MAX_WORKERS,
+                 conditional_requests=False, validators_size=DEFAULT_VALIDATORS_SIZE, throttle=None,
+                 timeout=DEFAULT_TIMEOUT, retry_policy=None, circuit_breaker=None,
+                 streaming=False, chunk_size=DEFAULT_CHUNK_SIZE, compression=True, metrics=None,
+                 trace_attributes=None, failure_cooldown=30, exploration_rate=0.05):
+        """
+        :param base_url: URL of API, or list or comma separated string of URLs of equivalent
+         API endpoints, such as regional mirrors or caching proxy.
+        :param throttle: optional :class:`waldur_rijkscloud.throttling.Throttle` shared by clients of the account.
+        :param timeout: connect and read timeouts of a single request in seconds.
+        :param retry_policy: optional :class:`RetryPolicy`, requests are not retried by default.
+        :param circuit_breaker: optional :class:`waldur_rijkscloud.circuitbreaker.CircuitBreaker`.
+        :param streaming: parse resource lists incrementally, it requires ijson package.
+        :param chunk_size: number of listed resources which details are fetched at once.
+        :param compression: ask API to compress responses with gzip, deflate or brotli.
+        :param metrics: optional :class:`waldur_rijkscloud.metrics.MetricsRegistry` where requests are recorded.
+        :param trace_attributes: if it is not None, each request is recorded as OpenTelemetry span
+         with these attributes.
+        :param failure_cooldown: number of seconds endpoint is avoided after a failed request.
+        :param exploration_rate: share of requests sent to a random healthy endpoint to measure its latency.
+        """
+        # Endpoints are shared by clients of the process, see waldur_rijkscloud.endpoints.EndpointPool.
+        self.endpoints = get_endpoint_pool(
+            base_url, failure_cooldown=failure_cooldown, exploration_rate=exploration_rate)
+        self.base_url = self.endpoints.base_urls[0]
         self.headers = {
+            'Accept-Encoding': ACCEPT_ENCODING if compression else 'identity',
             'Content-Type': 'application/json',
             'apikey': apikey,
             'userid': userid,
         }
+        self.pool_size = pool_size
+        self.keep_alive = keep_alive
+        self.session_key = (tuple(self.endpoints.base_urls), userid, apikey)
+        self.max_workers = max_workers
+        # Nested fan-out spawns several thread pools, so number of
+        # requests in flight is limited by the client instead of the pool.
+        self._in_flight = threading.BoundedSemaphore(max_workers)
+        self.validators = get_validators_store(validators_size) if conditional_requests else None
+        self.throttle = throttle
+        self.timeout = timeout
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.circuit_breaker = circuit_breaker
+        self.streaming = streaming and ijson is not None
+        self.chunk_size = chunk_size
+        # Objects with observe method, such as metrics registry, which are notified of each request.
+        self.observers = [metrics] if metrics is not None else []
+        self.trace_attributes = trace_attributes
+
+    def deadline(self, seconds):
+        """
+        Fail requests made by the current thread within the context after given
+        number of seconds with DeadlineExceeded error. Worker threads of the client
+        inherit the deadline, other threads use :func:`bind_context` to inherit it.
+        Nested context may only shorten the deadline.
+        """
+        previous = get_deadline()
+        deadline = time.time() + seconds
+        return _set_deadline(deadline if previous is None else min(previous, deadline))
+
+    def _get_timeout(self):
+        deadline = get_deadline()
+        if deadline is None:
+            return self.timeout
+
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise DeadlineExceeded('Deadline of Rijkscloud API operation is exceeded.')
+        connect_timeout, read_timeout = self.timeout
+        return min(connect_timeout, remaining), min(read_timeout, remaining)
+
+    def _request(self, method, endpoint, headers=None, **kwargs):
+        if self.trace_attributes is None:
+            return self._request_with_retries(method, endpoint, headers, **kwargs)
+
+        template = get_endpoint_template(endpoint)
+        attributes = dict(self.trace_attributes, **{
+            'http.method': method.upper(),
+            'rijkscloud.endpoint': template,
+        })
+        with tracing.span('Rijkscloud %s %s' % (method.upper(), template), attributes) as span:
+            response = self._request_with_retries(method, endpoint, tracing.inject(dict(headers or {})), **kwargs)
+            span.set_attribute('http.status_code', response.status_code)
+            return response
+
+    def _request_with_retries(self, method, endpoint, headers=None, **kwargs):
+        headers = dict(self.headers, **headers) if headers else self.headers
+        attempt = 0
+        # Retries are sent to other endpoints while there are ones which have not failed.
+        failed = set()
+        while True:
+            base_url = self.endpoints.select(exclude=failed)
+            url = '%s/%s' % (base_url, endpoint)
+            try:
+                response = self._send_guarded(method, url, headers=headers, timeout=self._get_timeout(), **kwargs)
+            except DeadlineExceeded:
+                raise
+            except (requests.ConnectionError, requests.Timeout) as e:
+                failed.add(base_url)
+                # Request which has not reached API is sent to another endpoint without delay.
+                if is_connect_error(e) and len(failed) < len(self.endpoints.base_urls):
+                    continue
+                if not self._wait_for_retry(method, attempt):
+                    raise
+            else:
+                if response.status_code not in self.retry_policy.statuses or \
+                        not self._wait_for_retry(method, attempt, response):
+                    # Number of attempts tells whether an earlier attempt might have been processed.
+                    response.attempts = attempt + 1
+                    return response
+                failed.add(base_url)
+                response.close()
+            attempt += 1
+
+    def _wait_for_retry(self, method, attempt, response=None):
+        if not self.retry_policy.can_retry(method, attempt):
+            return False
+
+        delay = self.retry_policy.get_delay(attempt, response)
+        deadline = get_deadline()
+        if deadline is not None and time.time() + delay >= deadline:
+            return False
+
+        time.sleep(delay)
+        return True
+
+    def _send_guarded(self, method, url, **kwargs):
+        if self.circuit_breaker is None:
+            return self._send_throttled(method, url, **kwargs)
+
+        self.circuit_breaker.before_request()
+        try:
+            response = self._send_throttled(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            self.circuit_breaker.record(success=False)
+            raise
+        self.circuit_breaker.record(success=response.status_code < 500)
+        return response
+
+    def _send_throttled(self, method, url, **kwargs):
+        with self._in_flight:
+            if self.throttle is None:
+                return self._send_measured(method, url, **kwargs)
+
+            endpoint = '%s %s' % (method.upper(), get_endpoint_template(self.endpoints.split(url)[1]))
+            with self.throttle.request(endpoint) as outcome:
+                response = self._send_measured(method, url, **kwargs)
+                outcome['status'] = response.status_code
+                return response
+
+    def add_observer(self, observer):
+        self.observers = self.observers + [observer]
+
+    def remove_observer(self, observer):
+        self.observers = [item for item in self.observers if item is not observer]
+
+    def _send_measured(self, method, url, **kwargs):
+        observers = self.observers
+        if not observers and len(self.endpoints.base_urls) == 1:
+            return self._send(method, url, **kwargs)
+
+        base_url, endpoint = self.endpoints.split(url)
+        started = time.time()
+        try:
+            response = self._send(method, url, **kwargs)
+        except requests.RequestException:
+            latency = time.time() - started
+            self.endpoints.record(base_url, success=False)
+            for observer in observers:
+                observer.observe(method, endpoint, None, latency, 0)
+            raise
+        # Streamed body is not read yet, so that size on the wire is taken from headers.
+        size = int(response.headers.get('Content-Length') or 0)
+        latency = time.time() - started
+        self.endpoints.record(base_url, latency, success=response.status_code < 500)
+        for observer in observers:
+            observer.observe(method, endpoint, response.status_code, latency, size)
+        return response
+
+    def _send(self, method, url, **kwargs):
+        if self.keep_alive:
+            session = get_session(self.session_key, self.pool_size)
+            return session.request(method, url, **kwargs)
+
+        with requests.Session() as session:
+            return session.request(method, url, **kwargs)
+
+    def _map(self, func, items):
+        """
+        Apply func to every item, fetching up to max_workers items concurrently.
+        Result order matches items order and the first failed item raises its exception.
+        """
+        items = list(items)
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+
+        with futures.ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(bind_context(func), items))
+
+    def _imap(self, func, items):
+        """
+        Lazy variant of _map which consumes items by chunks of chunk_size,
+        so that only one chunk of items and results is held in memory.
+        """
+        items = iter(items)
+        while True:
+            chunk = list(itertools.islice(items, self.chunk_size))
+            if not chunk:
+                return
+            for result in self._map(func, chunk):
+                yield result
+
+    def _iter(self, endpoint, key):
+        """
+        Yield items of the array under key in the endpoint response.
+        In streaming mode the array is parsed while response is downloaded,
+        so that the whole response is never held in memory; such
+        requests are not conditional as there is no body to reuse.
+        """
+        if not self.streaming:
+            for item in self._get(endpoint, key) or []:
+                yield item
+            return
+
+        response = self._request('get', endpoint, stream=True)
+        try:
+            response.raise_for_status()
+            # Content encoding, such as gzip, is decoded while reading.
+            response.raw.decode_content = True
+            try:
+                for item in iter_json_items(response.raw, '%s.item' % key):
+                    yield item
+            except STREAM_ERRORS as e:
+                self._record_stream_failure(response)
+                raise convert_stream_error(e, response)
+        finally:
+            response.close()
+
+    def _record_stream_failure(self, response):
+        """
+        Report failure of endpoint whose response was broken after its status had been received.
+        Partially consumed response is not retried, as its items have already been yielded.
+        """
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(success=False)
+        base_url, _ = self.endpoints.split(response.url)
+        self.endpoints.record(base_url, success=False)
 
     def _get(self, endpoint, key):
-        url = '%s/%s' % (self.base_url, endpoint)
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()
-        data = response.json()
+        if self.validators is not None:
+            data = self._conditional_get(endpoint)
+        else:
+            response = self._request('get', endpoint)
+            response.raise_for_status()
+            data = loads(response.content)
         if key:
             return data.get(key)
         else:
             return data
 
+    def _conditional_get(self, endpoint):
+        """
+        Send validators of the previous response, so that server may reply
+        with 304 Not Modified instead of the same body. If server does not
+        return validators, request is not conditional.
+        """
+        validators_key = (self.session_key, endpoint)
+        entry = self.validators.get(validators_key)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        response = self._request('get', endpoint, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            # Body is copied, so that callers are not able to change cached one.
+            return copy.deepcopy(entry.data)
+
+        response.raise_for_status()
+        data = loads(response.content)
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            self.validators.set(validators_key, ValidatorsStore.Entry(
+                etag, last_modified, copy.deepcopy(data)))
+        elif entry is not None:
+            self.validators.delete(validators_key)
+        return data
+
     def _post(self, endpoint, body):
-        url = '%s/%s' % (self.base_url, endpoint)
-        response = requests.post(url, headers=self.headers, data=json.dumps(body))
+        response = self._request('post', endpoint, data=dumps(body))
         if response.status_code == 400 and response.content:
-            message = response.json()['error']['message']
+            message = loads(response.content)['error']['message']
             raise requests.HTTPError(message, response=response)
 
         response.raise_for_status()
         if response.content:
-            return response.json()
+            return loads(response.content)
 
     def _delete(self, endpoint):
-        url = '%s/%s' % (self.base_url, endpoint)
-        response = requests.delete(url, headers=self.headers)
+        response = self._request('delete', endpoint)
+        if response.status_code == 404 and response.attempts > 1:
+            # Failed or timed out attempt has in fact deleted the resource before it was retried.
+            return None
         response.raise_for_status()
         if response.content:
-            return response.json()
+            return loads(response.content)
 
     def list_flavors(self):
         return self._get('flavors', 'flavors')
@@ -56,8 +604,14 @@ class RijkscloudClient(object):
         return self._get(url, 'instance')
 
     def list_instances(self):
-        instances = self._get('instances', 'instances')
-        return [self.get_instance(instance['name']) for instance in instances]
+        return list(self.iter_instances())
+
+    def iter_instances(self):
+        """
+        Yield details of instances fetching them by chunks while the list is parsed.
+        """
+        instances = self._iter('instances', 'instances')
+        return self._imap(lambda instance: self.get_instance(instance['name']), instances)
 
     def create_instance(self, body):
         return self._post('instances', body)
@@ -71,7 +625,17 @@ class RijkscloudClient(object):
 
     def list_networks(self):
         networks = self._get('networks', 'networks')
-        return [self.get_network(network['name']) for network in networks]
+        return self._map(lambda network: self.get_network(network['name']), networks)
+
+    def list_network_names(self):
+        return [network['name'] for network in self._get('networks', 'networks')]
+
+    def iter_subnets(self, network_names):
+        """
+        Yield (network name, subnet) pairs for given networks as soon as subnets are fetched.
+        Subnet has the same format as returned by get_subnet.
+        """
+        return NetworkTreeFetcher(self, self.max_workers).iter_subnets(network_names)
 
     def list_floatingips(self):
         return self._get('networks/floats', 'floats')
@@ -86,21 +650,110 @@ class RijkscloudClient(object):
         url = 'networks/%s/subnets/%s/ips' % (network_name, subnet_name)
         return self._get(url, 'ips')
 
+    def iter_subnet_ips(self, network_name, subnet_name):
+        url = 'networks/%s/subnets/%s/ips' % (network_name, subnet_name)
+        return self._iter(url, 'ips')
+
     def list_subnets(self, network_name):
         url = 'networks/%s/subnets' % network_name
         subnets = self._get(url, 'subnets')
-        return [self.get_subnet(network_name, subnet['name']) for subnet in subnets]
+        return self._map(lambda subnet: self.get_subnet(network_name, subnet['name']), subnets)
 
     def get_volume(self, volume_name):
         url = 'volumes/%s' % volume_name
         return self._get(url, 'volume')
 
     def list_volumes(self):
-        volumes = self._get('volumes', 'volumes')
-        return [self.get_volume(volume['name']) for volume in volumes]
+        return list(self.iter_volumes())
+
+    def iter_volumes(self):
+        """
+        Yield details of volumes fetching them by chunks while the list is parsed.
+        """
+        volumes = self._iter('volumes', 'volumes')
+        return self._imap(lambda volume: self.get_volume(volume['name']), volumes)
 
     def create_volume(self, body):
         return self._post('volumes', body)
 
     def delete_volume(self, volume_name):
         return self._delete('volumes/%s' % volume_name)
+
+
+class NetworkTreeFetcher(object):
+    """
+    Fetch subnets of networks expanding each level of the tree in parallel.
+    Subnet details and IP addresses are requested concurrently and subnet
+    is yielded as soon as both of them are fetched, in order of completion.
+    """
+
+    def __init__(self, client, max_workers=DEFAULT_MAX_WORKERS):
+        self.client = client
+        self.max_workers = max(1, max_workers)
+        self.executor = None
+        self.pending = {}
+        self.partial_subnets = {}
+
+    def iter_subnets(self, network_names):
+        with futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            self.executor = executor
+            try:
+                for network_name in network_names:
+                    url = 'networks/%s/subnets' % network_name
+                    self._submit(self._on_subnets_listed, (network_name,), url, 'subnets')
+
+                while self.pending:
+                    done, _ = futures.wait(self.pending, return_when=futures.FIRST_COMPLETED)
+                    for future in done:
+                        callback, args = self.pending.pop(future)
+                        for item in callback(future.result(), *args):
+                            yield item
+            finally:
+                for future in self.pending:
+                    future.cancel()
+                self.pending = {}
+
+    def _submit(self, callback, args, endpoint, key):
+        future = self.executor.submit(bind_context(self.client._get), endpoint, key)
+        self.pending[future] = (callback, args)
+
+    def _on_subnets_listed(self, subnets, network_name):
+        for subnet in subnets:
+            subnet_name = subnet['name']
+            url = 'networks/%s/subnets/%s' % (network_name, subnet_name)
+            self.partial_subnets[(network_name, subnet_name)] = {}
+            self._submit(self._on_subnet_part, (network_name, subnet_name, 'subnet'), url, 'subnet')
+            self._submit(self._on_subnet_part, (network_name, subnet_name, 'ips'), url + '/ips', 'ips')
+        return []
+
+    def _on_subnet_part(self, data, network_name, subnet_name, part):
+        parts = self.partial_subnets[(network_name, subnet_name)]
+        parts[part] = data
+        if len(parts) < 2:
+            return []
+
+        del self.partial_subnets[(network_name, subnet_name)]
+        subnet = dict(name=subnet_name, ips=parts['ips'], **parts['subnet'])
+        return [(network_name, subnet)]
+
+
+class AsyncRijkscloudClient(object):
+    """
+    Rijkscloud client with the same methods as RijkscloudClient,
+    but each method returns a future instead of the result.
+    """
+
+    def __init__(self, apikey, userid, async_workers=DEFAULT_ASYNC_WORKERS, **kwargs):
+        self.client = RijkscloudClient(apikey, userid, **kwargs)
+        self.executor = get_executor(async_workers)
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+        if name.startswith('_') or not callable(method):
+            raise AttributeError(name)
+
+        @functools.wraps(method)
+        def submit(*args, **kwargs):
+            return self.executor.submit(bind_context(method), *args, **kwargs)
+
+        return submit
@@ -0,0 +1,142 @@
+from __future__ import unicode_literals
+
+import logging
+import random
+import threading
+import time
+
+import requests
+import six
+from requests.packages.urllib3.exceptions import NewConnectionError
+
+logger = logging.getLogger(__name__)
+
+
+def parse_base_urls(value):
+    """
+    Return list of API URLs from string of comma or whitespace separated URLs, or from list of URLs.
+    """
+    if isinstance(value, six.string_types):
+        value = value.replace(',', ' ').split()
+    return [url.rstrip('/') for url in value if url]
+
+
+def is_connect_error(error):
+    """
+    Return True if request has failed before it was sent, so that it
+    may be sent to another endpoint even if it is not idempotent.
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class EndpointState(object):
+    __slots__ = ('latency', 'failed')
+
+    def __init__(self):
+        # Exponentially weighted moving average of latency, None until the first response.
+        self.latency = None
+        self.failed = None
+
+
+class EndpointPool(object):
+    """
+    Route requests to the healthy endpoint with the lowest average latency.
+
+    Endpoint is unhealthy for failure_cooldown seconds after connection error,
+    timeout or 5xx response. Endpoints without measured latency are preferred,
+    so that each endpoint is measured, and exploration_rate share of requests
+    is sent to a random healthy endpoint, so that latency of all endpoints is
+    kept up to date. If all endpoints are unhealthy, the one which failed the
+    earliest is used.
+    """
+
+    def __init__(self, base_urls, failure_cooldown=30, exploration_rate=0.05, smoothing=0.2):
+        self.base_urls = parse_base_urls(base_urls)
+        if not self.base_urls:
+            raise ValueError('At least one Rijkscloud API URL is required.')
+        self.failure_cooldown = failure_cooldown
+        self.exploration_rate = exploration_rate
+        self.smoothing = smoothing
+        self._states = {url: EndpointState() for url in self.base_urls}
+        self._lock = threading.Lock()
+
+    def select(self, exclude=()):
+        """
+        Return base URL of endpoint for the next request, excluded endpoints are used only if there are no others.
+        """
+        if len(self.base_urls) == 1:
+            return self.base_urls[0]
+
+        now = time.time()
+        with self._lock:
+            candidates = [url for url in self.base_urls if url not in exclude] or self.base_urls
+            healthy = [url for url in candidates if self._is_healthy(self._states[url], now)]
+            if not healthy:
+                return min(candidates, key=lambda url: self._states[url].failed)
+            if len(healthy) > 1 and random.random() < self.exploration_rate:
+                return random.choice(healthy)
+            return min(healthy, key=lambda url: self._states[url].latency or 0)
+
+    def _is_healthy(self, state, now):
+        return state.failed is None or now - state.failed >= self.failure_cooldown
+
+    def record(self, base_url, latency=None, success=True):
+        """
+        Report outcome of request sent to endpoint.
+        """
+        if len(self.base_urls) == 1 or base_url not in self._states:
+            return
+
+        with self._lock:
+            state = self._states[base_url]
+            if not success:
+                if state.failed is None:
+                    logger.warning('Rijkscloud API endpoint %s is unavailable, requests fail over.', base_url)
+                state.failed = time.time()
+                return
+
+            if state.failed is not None:
+                logger.info('Rijkscloud API endpoint %s is available again.', base_url)
+            state.failed = None
+            if latency is not None:
+                if state.latency is None:
+                    state.latency = latency
+                else:
+                    state.latency += self.smoothing * (latency - state.latency)
+
+    def split(self, url):
+        """
+        Return base URL of endpoint and API endpoint path of URL of request.
+        """
+        for base_url in self.base_urls:
+            if url.startswith(base_url + '/'):
+                return base_url, url[len(base_url) + 1:]
+        return None, url
+
+    def get_state(self):
+        """
+        Return dict of average latency and health of endpoints keyed by base URL.
+        """
+        now = time.time()
+        with self._lock:
+            return {url: {'latency': state.latency, 'healthy': self._is_healthy(state, now)}
+                    for url, state in self._states.items()}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_endpoint_pool(base_urls, **options):
+    """
+    Return endpoint pool shared by all clients of the process for the given endpoints.
+    """
+    key = tuple(parse_base_urls(base_urls))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = EndpointPool(key, **options)
+        return pool
@@ -3,7 +3,8 @@ from __future__ import unicode_literals
 from celery import chain
 
 from waldur_core.core import executors as core_executors
-from waldur_core.core import tasks as core_tasks
+
+from . import tasks, tracing
 
 
 class VolumePullExecutor(core_executors.ActionExecutor):
@@ -11,26 +12,30 @@ class VolumePullExecutor(core_executors.ActionExecutor):
 
     @classmethod
     def get_task_signature(cls, volume, serialized_volume, **kwargs):
-        return core_tasks.BackendMethodTask().si(
+        return tasks.BackendMethodTask().si(
             serialized_volume, 'pull_volume',
-            state_transition='begin_updating')
+            state_transition='begin_updating',
+            trace_context=tracing.get_executor_context(cls, volume))
 
 
 class VolumeCreateExecutor(core_executors.CreateExecutor):
 
     @classmethod
     def get_task_signature(cls, volume, serialized_volume, **kwargs):
+        trace_context = tracing.get_executor_context(cls, volume)
         return chain(
-            core_tasks.BackendMethodTask().si(
+            tasks.BackendMethodTask().si(
                 serialized_volume,
                 'create_volume',
-                state_transition='begin_creating'
+                state_transition='begin_creating',
+                trace_context=trace_context,
             ),
-            core_tasks.PollRuntimeStateTask().si(
+            tasks.PollRuntimeStateTask().si(
                 serialized_volume,
                 backend_pull_method='pull_volume_runtime_state',
                 success_state='available',
                 erred_state='error',
+                trace_context=trace_context,
             ).set(countdown=30)
         )
 
@@ -39,14 +44,18 @@ class VolumeDeleteExecutor(core_executors.DeleteExecutor):
 
     @classmethod
     def get_task_signature(cls, volume, serialized_volume, **kwargs):
+        trace_context = tracing.get_executor_context(cls, volume)
         if volume.backend_id:
             return chain(
-                core_tasks.BackendMethodTask().si(
-                    serialized_volume, 'delete_volume', state_transition='begin_deleting'),
-                core_tasks.PollBackendCheckTask().si(serialized_volume, 'is_volume_deleted'),
+                tasks.BackendMethodTask().si(
+                    serialized_volume, 'delete_volume', state_transition='begin_deleting',
+                    trace_context=trace_context),
+                tasks.PollBackendCheckTask().si(
+                    serialized_volume, 'is_volume_deleted', trace_context=trace_context),
             )
         else:
-            return core_tasks.StateTransitionTask().si(serialized_volume, state_transition='begin_deleting')
+            return tasks.StateTransitionTask().si(
+                serialized_volume, state_transition='begin_deleting', trace_context=trace_context)
 
 
 class InstancePullExecutor(core_executors.ActionExecutor):
@@ -54,19 +63,21 @@ class InstancePullExecutor(core_executors.ActionExecutor):
 
     @classmethod
     def get_task_signature(cls, volume, serialized_volume, **kwargs):
-        return core_tasks.BackendMethodTask().si(
+        return tasks.BackendMethodTask().si(
             serialized_volume, 'pull_instance',
-            state_transition='begin_updating')
+            state_transition='begin_updating',
+            trace_context=tracing.get_executor_context(cls, volume))
 
 
 class InstanceCreateExecutor(core_executors.CreateExecutor):
 
     @classmethod
     def get_task_signature(cls, volume, serialized_volume, **kwargs):
-        return core_tasks.BackendMethodTask().si(
+        return tasks.BackendMethodTask().si(
             serialized_volume,
             'create_instance',
-            state_transition='begin_creating'
+            state_transition='begin_creating',
+            trace_context=tracing.get_executor_context(cls, volume),
         )
 
 
@@ -74,33 +85,39 @@ class InstanceDeleteExecutor(core_executors.DeleteExecutor):
 
     @classmethod
     def get_task_signature(cls, instance, serialized_instance, **kwargs):
+        trace_context = tracing.get_executor_context(cls, instance)
         if instance.backend_id:
-            return cls.get_delete_instance_tasks(instance, serialized_instance)
+            return cls.get_delete_instance_tasks(instance, serialized_instance, trace_context)
         else:
-            return core_tasks.StateTransitionTask().si(serialized_instance, state_transition='begin_deleting')
+            return tasks.StateTransitionTask().si(
+                serialized_instance, state_transition='begin_deleting', trace_context=trace_context)
 
     @classmethod
-    def get_delete_instance_tasks(cls, instance, serialized_instance):
+    def get_delete_instance_tasks(cls, instance, serialized_instance, trace_context=None):
         _tasks = [
-            core_tasks.BackendMethodTask().si(
+            tasks.BackendMethodTask().si(
                 serialized_instance,
                 'delete_instance',
-                state_transition='begin_deleting'
+                state_transition='begin_deleting',
+                trace_context=trace_context,
             ),
-            core_tasks.PollBackendCheckTask().si(
+            tasks.PollBackendCheckTask().si(
                 serialized_instance,
-                'is_instance_deleted'
+                'is_instance_deleted',
+                trace_context=trace_context,
             ),
-            core_tasks.IndependentBackendMethodTask().si(
+            tasks.IndependentBackendMethodTask().si(
                 serialized_instance,
-                'pull_networks'
+                'pull_networks',
+                trace_context=trace_context,
             ),
         ]
 
         if instance.floating_ip:
-            _tasks.append(core_tasks.IndependentBackendMethodTask().si(
+            _tasks.append(tasks.IndependentBackendMethodTask().si(
                 serialized_instance,
-                'pull_floating_ips'
+                'pull_floating_ips',
+                trace_context=trace_context,
             ))
 
         return chain(_tasks)
@@ -5,6 +5,130 @@ from waldur_core.core import WaldurExtension
 
 class RijkscloudExtension(WaldurExtension):
 
+    class Settings:
+        WALDUR_RIJKSCLOUD = {
+            # Maximum number of idle HTTP connections kept open per Rijkscloud account.
+            'POOL_SIZE': 10,
+            # Reuse HTTP connections between API calls.
+            'KEEP_ALIVE': True,
+            # Maximum number of concurrent API requests made by one client
+            # when details of listed resources are fetched.
+            'MAX_WORKERS': 10,
+            # Size of thread pool shared by asynchronous calls of all clients within process.
+            'ASYNC_WORKERS': 20,
+            # Number of sync phases (flavors, floating IPs, networks, volumes
+            # and instances) which may run concurrently, 1 means sequential sync.
+            'SYNC_WORKERS': 1,
+            # Send conditional requests (If-None-Match / If-Modified-Since) and
+            # reuse previous response if API replies with 304 Not Modified.
+            'CONDITIONAL_REQUESTS': False,
+            # Maximum number of URLs for which validators and responses are kept.
+            'CONDITIONAL_REQUESTS_CACHE_SIZE': 10000,
+            # Parse volume, instance and IP address lists while they are downloaded
+            # instead of loading the whole response, it requires ijson package.
+            'STREAMING': True,
+            # Number of listed volumes or instances which details are fetched at once.
+            'CHUNK_SIZE': 100,
+            # Ask API to compress responses with gzip or deflate, or with brotli if it is installed.
+            'COMPRESSION': True,
+            # Record count, errors, response size and latency histogram of API requests
+            # per endpoint template, see waldur_rijkscloud.metrics.registry.
+            'METRICS': True,
+            # Store duration of phases, number of queries, API requests and changed rows
+            # of each synchronization as SyncRun, which are kept for given number of days.
+            # Queries are counted with debug cursor, which formats and passes each sync query
+            # to django.db.backends logger even if DEBUG is disabled, so it is off by default.
+            'SYNC_RUNS': False,
+            'SYNC_RUNS_RETENTION_DAYS': 90,
+            # Timeouts of a single API request in seconds.
+            'CONNECT_TIMEOUT': 10,
+            'READ_TIMEOUT': 60,
+            # Number of retries of idempotent requests failed because of connection
+            # errors, timeouts or temporary unavailability of API (429, 502, 503, 504).
+            'RETRIES': 3,
+            # Retry is delayed by random number of seconds up to
+            # min(MAX_BACKOFF, BACKOFF_FACTOR * 2 ** attempt).
+            'BACKOFF_FACTOR': 0.5,
+            'MAX_BACKOFF': 10,
+            # Maximum duration in seconds of all API requests made by one backend operation
+            # (such as instance creation) and by the whole synchronization of service settings.
+            'OPERATION_DEADLINE': 600,
+            'SYNC_DEADLINE': 3600,
+            # Besides backend URL, comma separated URLs of regional mirrors or caching proxy may be set
+            # as mirror_urls option of service settings. Requests are routed to the healthy endpoint
+            # with the lowest average latency and fail over to others on errors.
+            'ENDPOINTS': {
+                # Number of seconds endpoint is avoided after connection error, timeout or 5xx response.
+                'FAILURE_COOLDOWN': 30,
+                # Share of requests sent to a random healthy endpoint so that latency of all endpoints is measured.
+                'EXPLORATION_RATE': 0.05,
+            },
+            'CIRCUIT_BREAKER': {
+                # Number of consecutive failed API requests (connection errors, timeouts
+                # and 5xx responses) after which requests fail fast, 0 disables circuit breaker.
+                'FAILURE_THRESHOLD': 5,
+                # Number of seconds after which one probe request is let through.
+                'RECOVERY_TIMEOUT': 30,
+                # Either 'locmem' for in-process state or 'django' for Django cache shared by workers.
+                'STORE': 'locmem',
+                'DJANGO_CACHE_ALIAS': 'default',
+            },
+            # Profiling of backend methods; ENABLED, PROFILER, RATE and DIRECTORY may be overridden by
+            # WALDUR_RIJKSCLOUD_PROFILER (cprofile, sampling or off), WALDUR_RIJKSCLOUD_PROFILING_RATE
+            # and WALDUR_RIJKSCLOUD_PROFILING_DIRECTORY environment variables.
+            'PROFILING': {
+                'ENABLED': False,
+                # Either 'cprofile' which dumps pstats files or 'sampling' which dumps
+                # folded stacks for flame graphs and has low overhead.
+                'PROFILER': 'sampling',
+                # Share of invocations which are profiled, from 0 to 1.
+                'RATE': 1,
+                # Number of seconds between stack samples of sampling profiler.
+                'SAMPLING_INTERVAL': 0.01,
+                # Shell-style patterns of names of profiled methods.
+                'METHODS': ['sync', 'pull_*', 'create_*', 'import_*'],
+                'DIRECTORY': '/var/lib/waldur/rijkscloud-profiles',
+            },
+            'TRACING': {
+                # Record OpenTelemetry spans of executor tasks, backend methods and API requests,
+                # it requires opentelemetry-api package. Spans are dropped unless tracer provider
+                # is configured by the host application or EXPORTER_ENDPOINT is set.
+                'ENABLED': True,
+                # Shell-style patterns of names of traced backend methods.
+                'METHODS': ['ping', 'sync', 'pull_*', 'create_*', 'delete_*', 'import_*', 'is_*_deleted'],
+                # OTLP/HTTP traces endpoint of collector, such as http://localhost:4318/v1/traces,
+                # it requires opentelemetry-sdk and opentelemetry-exporter-otlp-proto-http packages.
+                'EXPORTER_ENDPOINT': '',
+                'SERVICE_NAME': 'waldur',
+            },
+            'THROTTLING': {
+                # Average number of API requests per second per account, 0 disables rate limiting.
+                'RATE': 0,
+                'BURST': 10,
+                # Concurrency limit per account is halved when API replies with 429 or 5xx
+                # or when latency exceeds average one LATENCY_SPIKE_RATIO times,
+                # and it is slowly increased back while API is healthy.
+                'MIN_CONCURRENCY': 1,
+                'MAX_CONCURRENCY': 10,
+                'LATENCY_SPIKE_RATIO': 3,
+            },
+            'CACHE': {
+                # Either 'locmem' for in-process cache or 'django' for Django cache shared by workers.
+                'STORE': 'locmem',
+                'DJANGO_CACHE_ALIAS': 'default',
+                # Maximum number of entries in in-process cache.
+                'MAX_SIZE': 1000,
+                # Number of seconds during which catalogue endpoint response is fresh, 0 disables caching.
+                'TTL': {
+                    'flavors': 0,
+                    'floating_ips': 0,
+                },
+                # Number of seconds after TTL during which outdated response may be
+                # returned to callers which tolerate it, while it is refreshed in background.
+                'STALE_TTL': 0,
+            },
+        }
+
     @staticmethod
     def django_app():
         return 'waldur_rijkscloud'
@@ -65,3 +65,17 @@ class FloatingIPFilter(structure_filters.ServicePropertySettingsFilter):
         model = models.FloatingIP
         fields = structure_filters.ServicePropertySettingsFilter.Meta.fields + (
             'address',)
+
+
+class SyncRunFilter(django_filters.FilterSet):
+    settings = core_filters.URLFilter(view_name='servicesettings-detail', name='settings__uuid')
+    settings_uuid = django_filters.UUIDFilter(name='settings__uuid')
+    succeeded = django_filters.BooleanFilter(widget=BooleanWidget)
+    started_from = django_filters.IsoDateTimeFilter(name='started', lookup_expr='gte')
+    started_to = django_filters.IsoDateTimeFilter(name='started', lookup_expr='lte')
+
+    o = django_filters.OrderingFilter(fields=('started', 'duration'))
+
+    class Meta(object):
+        model = models.SyncRun
+        fields = []
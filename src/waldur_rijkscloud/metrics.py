@@ -0,0 +1,180 @@
+from __future__ import unicode_literals
+
+import bisect
+import collections
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of latency histogram buckets in seconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Path segments which are part of endpoint itself rather than resource names.
+ENDPOINT_LITERALS = {'floats'}
+
+
+def get_endpoint_template(endpoint):
+    """
+    Replace resource names in endpoint with placeholder, for example
+    networks/net-1/subnets/subnet-1/ips becomes networks/{name}/subnets/{name}/ips.
+    Every second segment of Rijkscloud API endpoint is a resource name.
+    """
+    segments = endpoint.split('?', 1)[0].split('/')
+    for index in range(1, len(segments), 2):
+        if segments[index] not in ENDPOINT_LITERALS:
+            segments[index] = '{name}'
+    return '/'.join(segments)
+
+
+class EndpointStats(object):
+    __slots__ = ('count', 'errors', 'bytes', 'latency_sum', 'buckets')
+
+    def __init__(self, buckets_count):
+        self.count = 0
+        self.errors = 0
+        self.bytes = 0
+        self.latency_sum = 0.0
+        # The last bucket counts requests slower than the largest bound.
+        self.buckets = [0] * (buckets_count + 1)
+
+
+Observation = collections.namedtuple('Observation', ('method', 'endpoint', 'status', 'latency', 'bytes'))
+
+
+class MetricsRegistry(object):
+    """
+    Per endpoint template counters of API requests, errors, response bytes and latency histogram.
+
+    Observation takes a lock and a few dict and list operations, it is bound
+    to 10 microseconds per request on a modern CPU (see benchmark_metrics in
+    tests/benchmarks.py), which is below 0.1% of latency of a typical API request.
+    Hooks are called synchronously in the thread which made the request,
+    so that their cost is added to this bound.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bucket_bounds = tuple(sorted(buckets))
+        self.hooks = []
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """
+        Subscribe callable to observations, it is called with :class:`Observation` after each request.
+        """
+        with self._lock:
+            self.hooks = self.hooks + [hook]
+
+    def remove_hook(self, hook):
+        with self._lock:
+            self.hooks = [item for item in self.hooks if item != hook]
+
+    def observe(self, method, endpoint, status, latency, size):
+        """
+        Record API request. Status is None if no response has been received.
+        """
+        template = get_endpoint_template(endpoint)
+        bucket = bisect.bisect_left(self.bucket_bounds, latency)
+        key = (method, template)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = EndpointStats(len(self.bucket_bounds))
+            stats.count += 1
+            if status is None or status >= 400:
+                stats.errors += 1
+            stats.bytes += size
+            stats.latency_sum += latency
+            stats.buckets[bucket] += 1
+            hooks = self.hooks
+
+        if hooks:
+            observation = Observation(method, template, status, latency, size)
+            for hook in hooks:
+                try:
+                    hook(observation)
+                except Exception:
+                    logger.exception('Rijkscloud API metrics hook %s has failed.', hook)
+
+    def get_stats(self):
+        """
+        Return dict of per endpoint stats keyed by (method, endpoint template).
+        Histogram is returned as list of (upper bound, cumulative count) pairs.
+        """
+        with self._lock:
+            items = [(key, (stats.count, stats.errors, stats.bytes, stats.latency_sum, list(stats.buckets)))
+                     for key, stats in self._stats.items()]
+
+        result = {}
+        for key, (count, errors, size, latency_sum, buckets) in items:
+            cumulative = 0
+            histogram = []
+            for bound, bucket_count in zip(self.bucket_bounds + (float('inf'),), buckets):
+                cumulative += bucket_count
+                histogram.append((bound, cumulative))
+            result[key] = {
+                'count': count,
+                'errors': errors,
+                'bytes': size,
+                'latency_sum': latency_sum,
+                'histogram': histogram,
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def export_prometheus(self, prefix='rijkscloud_api'):
+        """
+        Render stats in Prometheus text exposition format.
+        """
+        stats = sorted(self.get_stats().items())
+        lines = []
+
+        def add_metric(name, metric_type, description, samples):
+            lines.append('# HELP %s_%s %s' % (prefix, name, description))
+            lines.append('# TYPE %s_%s %s' % (prefix, name, metric_type))
+            for suffix, labels, value in samples:
+                lines.append('%s_%s%s{%s} %s' % (prefix, name, suffix, _format_labels(labels), _format_value(value)))
+
+        add_metric('requests_total', 'counter', 'Number of Rijkscloud API requests.', [
+            ('', _get_labels(key), item['count']) for key, item in stats])
+        add_metric('request_errors_total', 'counter',
+                   'Number of Rijkscloud API requests failed with connection error or HTTP error status.', [
+                       ('', _get_labels(key), item['errors']) for key, item in stats])
+        add_metric('response_bytes_total', 'counter', 'Size of Rijkscloud API responses on the wire in bytes.', [
+            ('', _get_labels(key), item['bytes']) for key, item in stats])
+
+        samples = []
+        for key, item in stats:
+            labels = _get_labels(key)
+            for bound, count in item['histogram']:
+                samples.append(('_bucket', labels + [('le', bound)], count))
+            samples.append(('_sum', labels, item['latency_sum']))
+            samples.append(('_count', labels, item['count']))
+        add_metric('request_duration_seconds', 'histogram', 'Latency of Rijkscloud API requests in seconds.', samples)
+        return '\n'.join(lines) + '\n'
+
+
+def _get_labels(key):
+    method, endpoint = key
+    return [('method', method), ('endpoint', endpoint)]
+
+
+def _format_labels(labels):
+    return ','.join('%s="%s"' % (name, _escape(_format_value(value))) for name, value in labels)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return '%s' % value
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
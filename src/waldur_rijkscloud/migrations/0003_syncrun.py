@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import waldur_core.core.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('structure', '0001_squashed_0054'),
+        ('waldur_rijkscloud', '0002_add_network'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('uuid', waldur_core.core.fields.UUIDField()),
+                ('started', models.DateTimeField(db_index=True)),
+                ('duration', models.FloatField(help_text='Duration of synchronization in seconds.')),
+                ('succeeded', models.BooleanField(default=True)),
+                ('error_message', models.TextField(blank=True)),
+                ('phases', waldur_core.core.fields.JSONField(default=list, help_text='Name, start offset and duration in seconds of each phase.')),
+                ('queries', models.PositiveIntegerField(default=0, help_text='Number of database queries.')),
+                ('requests', models.PositiveIntegerField(default=0, help_text='Number of API requests.')),
+                ('transferred_bytes', models.BigIntegerField(default=0, help_text='Size of API responses on the wire.')),
+                ('created_rows', models.PositiveIntegerField(default=0)),
+                ('updated_rows', models.PositiveIntegerField(default=0)),
+                ('deleted_rows', models.PositiveIntegerField(default=0)),
+                ('settings', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='structure.ServiceSettings')),
+            ],
+            options={
+                'ordering': ('-started',),
+                'verbose_name': 'Synchronization run',
+                'verbose_name_plural': 'Synchronization runs',
+            },
+        ),
+    ]
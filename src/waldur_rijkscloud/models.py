@@ -4,6 +4,7 @@ from django.db import models
 from django.utils.translation import ugettext_lazy as _
 from django.utils.encoding import python_2_unicode_compatible
 
+from waldur_core.core import models as core_models
 from waldur_core.core.fields import JSONField
 from waldur_core.logging.loggers import LoggableMixin
 from waldur_core.structure import models as structure_models
@@ -179,3 +180,37 @@ class InternalIP(structure_models.ServiceProperty):
 
     def __str__(self):
         return '%s (%s)' % (self.address, self.subnet.name)
+
+
+@python_2_unicode_compatible
+class SyncRun(core_models.UuidMixin, models.Model):
+    """
+    Statistics of one synchronization of service settings with Rijkscloud.
+    """
+    settings = models.ForeignKey(structure_models.ServiceSettings, related_name='+', on_delete=models.CASCADE)
+    started = models.DateTimeField(db_index=True)
+    duration = models.FloatField(help_text=_('Duration of synchronization in seconds.'))
+    succeeded = models.BooleanField(default=True)
+    error_message = models.TextField(blank=True)
+    phases = JSONField(default=list, help_text=_('Name, start offset and duration in seconds of each phase.'))
+    queries = models.PositiveIntegerField(default=0, help_text=_('Number of database queries.'))
+    requests = models.PositiveIntegerField(default=0, help_text=_('Number of API requests.'))
+    transferred_bytes = models.BigIntegerField(default=0, help_text=_('Size of API responses on the wire.'))
+    created_rows = models.PositiveIntegerField(default=0)
+    updated_rows = models.PositiveIntegerField(default=0)
+    deleted_rows = models.PositiveIntegerField(default=0)
+
+    class Meta(object):
+        ordering = ('-started',)
+        verbose_name = _('Synchronization run')
+        verbose_name_plural = _('Synchronization runs')
+
+    class Permissions(object):
+        customer_path = 'settings__customer'
+
+    @classmethod
+    def get_url_name(cls):
+        return 'rijkscloud-sync-run'
+
+    def __str__(self):
+        return '%s (%s)' % (self.settings, self.started)
@@ -0,0 +1,161 @@
+from __future__ import unicode_literals
+
+import collections
+import cProfile
+import datetime
+import fnmatch
+import functools
+import logging
+import os
+import random
+import sys
+import threading
+
+from django.conf import settings as django_settings
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class CProfileProfiler(object):
+    """
+    Deterministic profiler, output is pstats file which is loaded with pstats.Stats or snakeviz.
+    """
+    extension = 'pstats'
+
+    def __init__(self, options):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def dump(self, path):
+        self.profile.dump_stats(path)
+
+
+class SamplingProfiler(object):
+    """
+    Statistical profiler which records stack of the profiled thread every
+    SAMPLING_INTERVAL seconds from a background thread. Its overhead does not
+    depend on number of calls, so that it may stay enabled in production.
+    Output is in folded stacks format accepted by flamegraph.pl and speedscope.
+    """
+    extension = 'folded'
+
+    def __init__(self, options):
+        self.interval = options['SAMPLING_INTERVAL']
+        self.stacks = collections.Counter()
+        self._thread_id = None
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self._thread_id = threading.current_thread().ident
+        self._sampler = threading.Thread(target=self._run)
+        self._sampler.daemon = True
+        self._sampler.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._sampler.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.stacks[self._get_stack(frame)] += 1
+
+    @staticmethod
+    def _get_stack(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append('%s (%s:%s)' % (code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def dump(self, path):
+        with open(path, 'w') as output:
+            for stack, count in self.stacks.most_common():
+                output.write('%s %s\n' % (stack, count))
+
+
+PROFILERS = {
+    'cprofile': CProfileProfiler,
+    'sampling': SamplingProfiler,
+}
+
+
+def get_options():
+    """
+    Return profiling options from WALDUR_RIJKSCLOUD['PROFILING'] settings overridden by
+    environment variables WALDUR_RIJKSCLOUD_PROFILER (cprofile, sampling or off),
+    WALDUR_RIJKSCLOUD_PROFILING_RATE and WALDUR_RIJKSCLOUD_PROFILING_DIRECTORY.
+    """
+    options = dict(django_settings.WALDUR_RIJKSCLOUD['PROFILING'])
+    profiler = os.environ.get('WALDUR_RIJKSCLOUD_PROFILER')
+    if profiler:
+        options['ENABLED'] = profiler != 'off'
+        if profiler != 'off':
+            options['PROFILER'] = profiler
+    if os.environ.get('WALDUR_RIJKSCLOUD_PROFILING_RATE'):
+        options['RATE'] = float(os.environ['WALDUR_RIJKSCLOUD_PROFILING_RATE'])
+    if os.environ.get('WALDUR_RIJKSCLOUD_PROFILING_DIRECTORY'):
+        options['DIRECTORY'] = os.environ['WALDUR_RIJKSCLOUD_PROFILING_DIRECTORY']
+    return options
+
+
+def profile(func, name, label, options):
+    """
+    Wrap func so that a share of its invocations given by RATE is profiled and
+    profile is dumped to DIRECTORY. Invocations nested into a profiled one
+    within the same thread are not profiled separately.
+    """
+    profiler_class = PROFILERS[options['PROFILER']]
+
+    @functools.wraps(func)
+    def wrapped(*args, **kwargs):
+        if getattr(_local, 'active', False) or random.random() >= options['RATE']:
+            return func(*args, **kwargs)
+
+        profiler = profiler_class(options)
+        _local.active = True
+        profiler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.stop()
+            _local.active = False
+            filename = '%s-%s-%s-%s.%s' % (
+                name, label, datetime.datetime.now().strftime('%Y%m%d%H%M%S%f'), os.getpid(), profiler.extension)
+            try:
+                if not os.path.isdir(options['DIRECTORY']):
+                    os.makedirs(options['DIRECTORY'])
+                profiler.dump(os.path.join(options['DIRECTORY'], filename))
+            except (IOError, OSError):
+                logger.exception('Unable to save profile of Rijkscloud backend method %s.', name)
+
+    return wrapped
+
+
+def instrument(obj, label):
+    """
+    Replace methods of obj matching METHODS patterns with profiled ones if profiling is enabled.
+    """
+    options = get_options()
+    if not options['ENABLED'] or not options['RATE']:
+        return
+    if options['PROFILER'] not in PROFILERS:
+        logger.error('Unknown profiler %s, it should be one of %s.', options['PROFILER'], ', '.join(PROFILERS))
+        return
+
+    for name in dir(obj):
+        if name.startswith('_') or not any(fnmatch.fnmatch(name, pattern) for pattern in options['METHODS']):
+            continue
+        method = getattr(obj, name)
+        if callable(method):
+            setattr(obj, name, profile(method, name, label, options))
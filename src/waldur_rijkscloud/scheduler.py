@@ -0,0 +1,94 @@
+from __future__ import unicode_literals
+
+import collections
+from concurrent import futures
+import logging
+import time
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+PhaseTiming = collections.namedtuple('PhaseTiming', ('name', 'started', 'duration'))
+
+
+class SyncScheduler(object):
+    """
+    Run phases of synchronization respecting dependencies between them.
+    Phase is started as soon as all its dependencies are completed, so that
+    independent phases run concurrently if more than one worker is allowed.
+    Phases have to be added after their dependencies.
+    """
+
+    def __init__(self, max_workers=1):
+        self.max_workers = max_workers
+        self.phases = collections.OrderedDict()
+        self.timings = []
+        self._started = None
+
+    def add(self, name, func, dependencies=()):
+        for dependency in dependencies:
+            if dependency not in self.phases:
+                raise ValueError('Phase %s depends on unknown phase %s.' % (name, dependency))
+        self.phases[name] = (func, set(dependencies))
+
+    def run(self):
+        """
+        Run all phases and return their timings in order of completion.
+        If phase fails, its dependants are not started and the error is raised
+        after running phases are completed.
+        """
+        self.timings = []
+        self._started = time.time()
+        if self.max_workers <= 1:
+            for name, (func, _) in self.phases.items():
+                self._run_phase(name, func)
+        else:
+            self._run_concurrently()
+        return self.timings
+
+    def _run_phase(self, name, func):
+        started = time.time()
+        try:
+            func()
+        finally:
+            duration = time.time() - started
+            self.timings.append(PhaseTiming(name, started - self._started, duration))
+            logger.debug('Sync phase %s took %.3f seconds.', name, duration)
+
+    def _run_phase_in_thread(self, name, func):
+        try:
+            self._run_phase(name, func)
+        finally:
+            # Worker threads open their own database connections.
+            connection.close()
+
+    def _run_concurrently(self):
+        pending = collections.OrderedDict(self.phases)
+        completed = set()
+        error = None
+
+        with futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            while pending or running:
+                if error is None:
+                    for name, (func, dependencies) in list(pending.items()):
+                        if dependencies <= completed:
+                            del pending[name]
+                            running[executor.submit(self._run_phase_in_thread, name, func)] = name
+                if not running:
+                    break
+
+                done, _ = futures.wait(running, return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        error = error or e
+                    else:
+                        completed.add(name)
+
+        if error is not None:
+            raise error
@@ -14,13 +14,27 @@ from .backend import RijkscloudBackendError
 class ServiceSerializer(core_serializers.ExtraFieldOptionsMixin,
                         structure_serializers.BaseServiceSerializer):
     SERVICE_ACCOUNT_FIELDS = {
+        'backend_url': _('API URL (default: https://api.ix.rijkscloud.nl)'),
         'username': '',
         'token': '',
     }
 
+    SERVICE_ACCOUNT_EXTRA_FIELDS = {
+        'mirror_urls': _('Comma separated URLs of equivalent API endpoints, such as regional mirrors '
+                         'or caching proxy, requests fail over to them and are routed to the fastest one.'),
+    }
+
     class Meta(structure_serializers.BaseServiceSerializer.Meta):
         model = models.RijkscloudService
         extra_field_options = {
+            'backend_url': {
+                'label': 'API URL',
+                'required': False,
+            },
+            'mirror_urls': {
+                'label': 'Mirror URLs',
+                'required': False,
+            },
             'username': {
                 'label': 'User ID',
                 'required': True
@@ -294,3 +308,15 @@ class FloatingIPSerializer(structure_serializers.BasePropertySerializer):
             'url': {'lookup_field': 'uuid'},
             'settings': {'lookup_field': 'uuid'},
         }
+
+
+class SyncRunSerializer(serializers.HyperlinkedModelSerializer):
+    class Meta(object):
+        model = models.SyncRun
+        fields = ('url', 'uuid', 'settings', 'started', 'duration', 'succeeded', 'error_message', 'phases',
+                  'queries', 'requests', 'transferred_bytes', 'created_rows', 'updated_rows', 'deleted_rows')
+        read_only_fields = fields
+        extra_kwargs = {
+            'url': {'lookup_field': 'uuid', 'view_name': 'rijkscloud-sync-run-detail'},
+            'settings': {'lookup_field': 'uuid', 'view_name': 'servicesettings-detail'},
+        }
@@ -0,0 +1,85 @@
+from __future__ import unicode_literals
+
+import contextlib
+import threading
+
+from django.db import connection
+
+
+class QueryCounter(object):
+    """
+    Replacement of queries log of database connection which counts
+    executed queries. Queries are stored only if they are forwarded to
+    the replaced log, because it is captured, for example by assertNumQueries.
+    """
+    # Database connection compares length of queries log with its maxlen.
+    maxlen = None
+
+    def __init__(self, stats, log=None):
+        self.stats = stats
+        self.log = log
+        if log is not None:
+            self.maxlen = log.maxlen
+
+    def append(self, query):
+        self.stats.add(queries=1)
+        if self.log is not None:
+            self.log.append(query)
+
+    def clear(self):
+        if self.log is not None:
+            self.log.clear()
+
+    def __len__(self):
+        return len(self.log) if self.log is not None else 0
+
+    def __iter__(self):
+        return iter(self.log) if self.log is not None else iter(())
+
+
+class SyncStats(object):
+    """
+    Counters of database queries, API requests and changed rows of one
+    synchronization, shared by all threads which run its phases.
+    """
+    FIELDS = ('queries', 'requests', 'transferred_bytes', 'created_rows', 'updated_rows', 'deleted_rows')
+
+    def __init__(self):
+        self.counters = dict.fromkeys(self.FIELDS, 0)
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, count in counts.items():
+                self.counters[name] += count
+
+    def observe(self, method, endpoint, status, latency, size):
+        """
+        Record API request, it has the same signature as MetricsRegistry.observe.
+        """
+        self.add(requests=1, transferred_bytes=size)
+
+    @contextlib.contextmanager
+    def count_queries(self):
+        """
+        Count queries executed by database connection of the current thread within the context.
+        Debug cursor is enabled, but executed queries are not stored unless they were logged before.
+        Nested context of the same statistics does not count queries again.
+
+        Note that debug cursor formats each query with its parameters and logs it
+        at DEBUG level to django.db.backends logger, so that counting adds overhead
+        to every query; that is why sync runs are not stored by default.
+        """
+        queries_log = connection.queries_log
+        if isinstance(queries_log, QueryCounter) and queries_log.stats is self:
+            yield
+            return
+
+        force_debug_cursor = connection.force_debug_cursor
+        connection.queries_log = QueryCounter(self, queries_log if connection.queries_logged else None)
+        connection.force_debug_cursor = True
+        try:
+            yield
+        finally:
+            connection.queries_log = queries_log
+            connection.force_debug_cursor = force_debug_cursor
@@ -0,0 +1,46 @@
+from __future__ import unicode_literals
+
+from waldur_core.core import tasks as core_tasks
+
+from . import tracing
+
+
+class TracedTaskMixin(object):
+    """
+    Record span of task within trace context passed by executor in trace_context keyword argument.
+    """
+
+    def run(self, serialized_instance, *args, **kwargs):
+        trace_context = kwargs.pop(tracing.TRACE_CONTEXT_KWARG, None)
+        return tracing.attached(trace_context, self._run_traced, serialized_instance, *args, **kwargs)
+
+    def _run_traced(self, serialized_instance, *args, **kwargs):
+        if not tracing.is_enabled():
+            return super(TracedTaskMixin, self).run(serialized_instance, *args, **kwargs)
+
+        with tracing.span('task %s' % self.__class__.__name__, {'waldur.instance': serialized_instance}):
+            return super(TracedTaskMixin, self).run(serialized_instance, *args, **kwargs)
+
+    def execute(self, instance, *args, **kwargs):
+        tracing.set_attributes(tracing.get_resource_attributes(instance))
+        return super(TracedTaskMixin, self).execute(instance, *args, **kwargs)
+
+
+class BackendMethodTask(TracedTaskMixin, core_tasks.BackendMethodTask):
+    pass
+
+
+class IndependentBackendMethodTask(TracedTaskMixin, core_tasks.IndependentBackendMethodTask):
+    pass
+
+
+class PollRuntimeStateTask(TracedTaskMixin, core_tasks.PollRuntimeStateTask):
+    pass
+
+
+class PollBackendCheckTask(TracedTaskMixin, core_tasks.PollBackendCheckTask):
+    pass
+
+
+class StateTransitionTask(TracedTaskMixin, core_tasks.StateTransitionTask):
+    pass
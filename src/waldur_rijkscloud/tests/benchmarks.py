@@ -0,0 +1,219 @@
+"""
+Micro-benchmarks for Rijkscloud client against a local stub server.
+
+Usage: python -m waldur_rijkscloud.tests.benchmarks
+
+Backend benchmarks are run only if Django is configured via DJANGO_SETTINGS_MODULE.
+Load benchmark is run against fake server started in process, or against
+API at RIJKSCLOUD_BASE_URL, such as fake server started by
+python -m waldur_rijkscloud.tests.fake_server.
+"""
+from __future__ import print_function, unicode_literals
+
+import json
+import os
+import time
+
+from six.moves import mock
+
+from .. import client, metrics
+from .fake_server import Dataset, FakeRijkscloudServer, Latency
+from .stub_server import StubServer
+
+
+def benchmark_connection_reuse(requests_count=200):
+    routes = {
+        'flavors': {'flavors': [{'name': 'general.%sgb' % i, 'vcpus': i, 'ram': i * 1024}
+                                for i in range(1, 9)]},
+    }
+    for keep_alive in (False, True):
+        with StubServer(routes) as server:
+            rijkscloud = client.RijkscloudClient(
+                apikey='secret', userid='admin', base_url=server.base_url, keep_alive=keep_alive)
+            started = time.time()
+            for _ in range(requests_count):
+                rijkscloud.list_flavors()
+            elapsed = time.time() - started
+            print('keep_alive=%-5s requests=%d connections=%d elapsed=%.3fs' % (
+                keep_alive, server.requests, server.connections, elapsed))
+        client.close_sessions()
+
+
+def benchmark_concurrent_fetch(instances_count=200, delay=0.005):
+    names = ['vm-%s' % i for i in range(instances_count)]
+    routes = {'instances': {'instances': [{'name': name} for name in names]}}
+    for name in names:
+        routes['instances/%s' % name] = {'instance': {'name': name, 'addresses': [], 'flavor': None}}
+
+    for max_workers in (1, 5, 20):
+        with StubServer(routes, delay=delay) as server:
+            rijkscloud = client.RijkscloudClient(
+                apikey='secret', userid='admin', base_url=server.base_url, max_workers=max_workers)
+            started = time.time()
+            rijkscloud.list_instances()
+            elapsed = time.time() - started
+            print('max_workers=%-3d requests=%d max_in_flight=%d elapsed=%.3fs' % (
+                max_workers, server.requests, server.max_in_flight, elapsed))
+        client.close_sessions()
+
+
+def benchmark_streaming(ips_count=100000):
+    try:
+        import tracemalloc
+    except ImportError:
+        print('Streaming benchmark requires Python 3.')
+        return
+    if client.ijson is None:
+        print('Streaming benchmark requires ijson.')
+        return
+
+    url = 'networks/net/subnets/subnet/ips'
+    routes = {url: {'ips': [{'ip': '10.%s.%s.%s' % (i >> 16, (i >> 8) & 255, i & 255), 'available': True}
+                            for i in range(ips_count)]}}
+    with StubServer(routes) as server:
+        for streaming in (False, True):
+            rijkscloud = client.RijkscloudClient(
+                apikey='secret', userid='admin', base_url=server.base_url, streaming=streaming)
+            tracemalloc.start()
+            started = time.time()
+            available = sum(1 for ip in rijkscloud.iter_subnet_ips('net', 'subnet') if ip['available'])
+            elapsed = time.time() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print('streaming=%-5s ips=%d peak_memory=%.1fMB elapsed=%.3fs' % (
+                streaming, available, peak / 1024.0 / 1024, elapsed))
+    client.close_sessions()
+
+
+# Catalogue, list and detail endpoints which response size and decoding time is measured.
+TRANSPORT_ENDPOINTS = (
+    'flavors',
+    'volumes',
+    'volumes/volume-00001',
+    'instances',
+    'instances/vm-00001',
+    'networks/net-000/subnets/subnet-000-000/ips',
+)
+
+
+def get_transport_routes():
+    routes = Dataset(volumes=100, instances=100, networks=1, subnets=1, ips=1000).get_routes()
+    return {endpoint: routes[endpoint] for endpoint in TRANSPORT_ENDPOINTS}
+
+
+def benchmark_transport(decode_iterations=200):
+    routes = get_transport_routes()
+    print('accept_encoding=%s json_codec=%s' % (client.ACCEPT_ENCODING, client.json_codec.__name__))
+    for endpoint in sorted(routes):
+        wire_bytes = {}
+        for compression in (False, True):
+            with StubServer(routes, compression=True) as server:
+                rijkscloud = client.RijkscloudClient(
+                    apikey='secret', userid='admin', base_url=server.base_url, compression=compression)
+                rijkscloud._get(endpoint, None)
+                wire_bytes[compression] = server.bytes_sent
+            client.close_sessions()
+
+        content = json.dumps(routes[endpoint], sort_keys=True).encode('utf-8')
+        decode_times = {}
+        for name, loads in (('json', json.loads), ('codec', client.loads)):
+            started = time.time()
+            for _ in range(decode_iterations):
+                loads(content)
+            decode_times[name] = (time.time() - started) / decode_iterations * 1000
+        print('%-44s identity=%7dB compressed=%7dB json=%.3fms %s=%.3fms' % (
+            endpoint, wire_bytes[False], wire_bytes[True], decode_times['json'],
+            client.json_codec.__name__, decode_times['codec']))
+
+
+def benchmark_metrics(observations=100000):
+    registry = metrics.MetricsRegistry()
+    endpoints = ['networks/net-%s/subnets/subnet-%s/ips' % (i, i) for i in range(100)]
+    started = time.time()
+    for index in range(observations):
+        registry.observe('get', endpoints[index % 100], 200, 0.05, 1000)
+    elapsed = time.time() - started
+    print('observations=%d overhead=%.2fus per request' % (observations, elapsed / observations * 1e6))
+
+
+def fetch_account(rijkscloud):
+    """
+    Fetch all resources of account in the same way as backend sync does.
+    """
+    rijkscloud.list_flavors()
+    rijkscloud.list_floatingips()
+    subnets = list(rijkscloud.iter_subnets(rijkscloud.list_network_names()))
+    volumes = rijkscloud.list_volumes()
+    instances = rijkscloud.list_instances()
+    return len(subnets), len(volumes), len(instances)
+
+
+def benchmark_load(instances_count=500, latency=0.01, max_workers=10):
+    options = dict(
+        max_workers=max_workers,
+        streaming=True,
+        retry_policy=client.RetryPolicy(retries=5, backoff_factor=0.05, max_backoff=1),
+    )
+    base_url = os.environ.get('RIJKSCLOUD_BASE_URL')
+    if base_url:
+        rijkscloud = client.RijkscloudClient(apikey='secret', userid='admin', base_url=base_url, **options)
+        started = time.time()
+        subnets, volumes, instances = fetch_account(rijkscloud)
+        print('base_url=%s subnets=%d volumes=%d instances=%d elapsed=%.3fs' % (
+            base_url, subnets, volumes, instances, time.time() - started))
+        client.close_sessions()
+        return
+
+    dataset = Dataset(volumes=instances_count, instances=instances_count, networks=4, subnets=4)
+    scenarios = (
+        ('constant latency', dict(latency=Latency(latency))),
+        ('long tail latency', dict(latency=Latency(latency, sigma=1))),
+        ('errors', dict(latency=Latency(latency), error_rate=0.02)),
+        ('rate limit', dict(latency=Latency(latency), rate=200, burst=20)),
+    )
+    for name, server_options in scenarios:
+        with FakeRijkscloudServer(dataset, **server_options) as server:
+            rijkscloud = client.RijkscloudClient(
+                apikey='secret', userid='admin', base_url=server.base_url, **options)
+            started = time.time()
+            fetch_account(rijkscloud)
+            elapsed = time.time() - started
+            print('%-18s requests=%d failed=%d throttled=%d max_in_flight=%d elapsed=%.3fs' % (
+                name, server.requests, server.failed, server.throttled, server.max_in_flight, elapsed))
+        client.close_sessions()
+
+
+def benchmark_importable_resources(count=10000):
+    from .. import models
+    from ..backend import RijkscloudBackend
+
+    backend = RijkscloudBackend.__new__(RijkscloudBackend)
+    backend.settings = None
+    resources = [models.Volume(backend_id='volume-%s' % i) for i in range(count)]
+    # Half of backend resources are registered, the other half are new.
+    registered = ['volume-%s' % i for i in range(count // 2, count + count // 2)]
+
+    with mock.patch.object(models.Volume.objects, 'filter') as mocked_filter:
+        mocked_filter.return_value.values_list.return_value = registered
+        started = time.time()
+        importable = backend._get_backend_resource(models.Volume, resources)
+        elapsed = time.time() - started
+    print('backend_resources=%d registered=%d importable=%d elapsed=%.3fs' % (
+        count, len(registered), len(importable), elapsed))
+
+
+def main():
+    benchmark_connection_reuse()
+    benchmark_concurrent_fetch()
+    benchmark_streaming()
+    benchmark_transport()
+    benchmark_metrics()
+    benchmark_load()
+    if os.environ.get('DJANGO_SETTINGS_MODULE'):
+        import django
+        django.setup()
+        benchmark_importable_resources()
+
+
+if __name__ == '__main__':
+    main()
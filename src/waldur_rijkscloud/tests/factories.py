@@ -4,6 +4,7 @@ from random import randint
 import uuid
 
 from django.urls import reverse
+from django.utils import timezone
 import factory
 
 from waldur_core.structure.tests import factories as structure_factories
@@ -125,3 +126,12 @@ class InstanceFactory(UrlModelFactory):
     backend_id = factory.Sequence(lambda n: 'vm_%s' % n)
     internal_ip = factory.SubFactory(InternalIPFactory)
     floating_ip = factory.SubFactory(FloatingIPFactory)
+
+
+class SyncRunFactory(UrlModelFactory):
+    class Meta(object):
+        model = models.SyncRun
+
+    settings = factory.SubFactory(ServiceSettingsFactory)
+    started = factory.LazyFunction(timezone.now)
+    duration = 10
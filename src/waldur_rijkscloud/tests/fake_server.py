@@ -0,0 +1,299 @@
+"""
+Fake Rijkscloud API for load and performance testing of the client and backend.
+
+It serves generated flavors, volumes, instances, networks, subnets, IP addresses
+and floating IPs, creates and deletes volumes and instances, and simulates
+latency, failures and rate limiting of the real API.
+
+Usage: python -m waldur_rijkscloud.tests.fake_server --port 8080 --instances 1000 --latency 0.05
+
+Client is pointed at it by base_url, for example
+RijkscloudClient(apikey, userid, base_url='http://127.0.0.1:8080'), backend is pointed
+at it by backend URL of service settings, and benchmarks are run against it if
+RIJKSCLOUD_BASE_URL environment variable is set.
+"""
+from __future__ import print_function, unicode_literals
+
+import argparse
+import math
+import random
+import threading
+import time
+
+from .stub_server import StubServer
+
+
+class Dataset(object):
+    """
+    Generator of consistent API documents: instances use existing flavors, volumes
+    are attached to instances and addresses of instances are taken from subnets.
+    """
+
+    def __init__(self, flavors=8, volumes=100, instances=100, networks=2, subnets=2, ips=254, floating_ips=20):
+        self.flavors = flavors
+        self.volumes = volumes
+        self.instances = instances
+        self.networks = networks
+        self.subnets = subnets
+        self.ips = ips
+        self.floating_ips = floating_ips
+
+    def get_routes(self):
+        routes = {}
+        flavors = [{'name': 'general.%sgb' % (2 ** i), 'vcpus': 2 ** i // 2 or 1, 'ram': 2 ** i * 1024}
+                   for i in range(1, self.flavors + 1)]
+        routes['flavors'] = {'flavors': flavors}
+
+        routes['networks'] = {'networks': []}
+        subnets = []
+        for i in range(self.networks):
+            network = 'net-%03d' % i
+            routes['networks']['networks'].append({'name': network})
+            routes['networks/%s/subnets' % network] = {'subnets': []}
+            for j in range(self.subnets):
+                subnet = 'subnet-%03d-%03d' % (i, j)
+                prefix = '10.%s' % ((i * self.subnets + j) % 256)
+                url = 'networks/%s/subnets/%s' % (network, subnet)
+                routes['networks/%s/subnets' % network]['subnets'].append({'name': subnet})
+                routes[url] = {'subnet': {
+                    'cidr': '%s.0.0/16' % prefix,
+                    'gateway_ip': '%s.0.1' % prefix,
+                    'allocation_pools': [{'start': '%s.0.2' % prefix, 'end': '%s.255.254' % prefix}],
+                    'dns_nameservers': ['8.8.8.8'],
+                }}
+                # Addresses follow the gateway and skip .0 and .255 of each /24 block.
+                routes[url + '/ips'] = {'ips': [
+                    {'ip': '%s.%s.%s' % (prefix, (k + 1) // 254 % 256, (k + 1) % 254 + 1), 'available': True}
+                    for k in range(self.ips)]}
+                subnets.append(routes[url + '/ips']['ips'])
+
+        floating_ips = [{'float_ip': '145.0.%s.%s' % (i // 254, i % 254 + 1), 'available': True}
+                        for i in range(self.floating_ips)]
+        routes['networks/floats'] = {'floats': floating_ips}
+
+        routes['instances'] = {'instances': []}
+        for i in range(self.instances):
+            name = 'vm-%05d' % i
+            addresses = []
+            if subnets:
+                ips = subnets[i % len(subnets)]
+                ip = ips[i // len(subnets) % len(ips)]
+                ip['available'] = False
+                addresses.append(ip['ip'])
+            if i < len(floating_ips):
+                floating_ips[i]['available'] = False
+                addresses.append(floating_ips[i]['float_ip'])
+            routes['instances']['instances'].append({'name': name})
+            routes['instances/%s' % name] = {'instance': {
+                'name': name,
+                'flavor': flavors[i % len(flavors)]['name'] if flavors else None,
+                'status': 'ACTIVE',
+                'addresses': addresses,
+                'volumes': [],
+            }}
+
+        routes['volumes'] = {'volumes': []}
+        for i in range(self.volumes):
+            name = 'volume-%05d' % i
+            attachments = []
+            if i < self.instances:
+                instance = 'vm-%05d' % i
+                attachments.append({'device': '/dev/vdb', 'instance': instance})
+                routes['instances/%s' % instance]['instance']['volumes'].append(name)
+            routes['volumes']['volumes'].append({'name': name})
+            routes['volumes/%s' % name] = {'volume': {
+                'name': name,
+                'size': 10 * (i % 10 + 1),
+                'description': None,
+                'metadata': {'bootable': 'false', 'readonly': 'False'},
+                'status': 'in-use' if attachments else 'available',
+                'attachments': attachments,
+            }}
+        return routes
+
+
+class Latency(object):
+    """
+    Log-normal distribution of response latency in seconds, which has a long
+    tail like latency of real APIs. Sigma 0 means constant latency.
+    """
+
+    def __init__(self, median=0, sigma=0):
+        self.median = median
+        self.sigma = sigma
+
+    def sample(self):
+        if not self.median or not self.sigma:
+            return self.median
+        return random.lognormvariate(math.log(self.median), self.sigma)
+
+
+class RateLimiter(object):
+    """
+    Token bucket which refills rate tokens per second up to burst.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Return 0 if request is allowed, otherwise number of seconds after which it is.
+        """
+        with self.lock:
+            now = time.time()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+
+class FakeRijkscloudServer(StubServer):
+    """
+    Stateful Rijkscloud API stand-in built on top of StubServer routes.
+
+    Each request is delayed by a sample of latency distribution, a share of
+    requests given by error_rate fails with one of error_statuses (temporary
+    unavailability by default), and requests
+    exceeding rate per second (after burst) are rejected with 429 and Retry-After.
+    Volumes and instances are created by POST and deleted by DELETE requests.
+    """
+
+    def __init__(self, dataset=None, latency=None, error_rate=0, error_statuses=(502, 503, 504),
+                 rate=0, burst=10, **kwargs):
+        super(FakeRijkscloudServer, self).__init__(routes=(dataset or Dataset()).get_routes(), **kwargs)
+        self.latency = latency or Latency()
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses
+        self.rate_limiter = RateLimiter(rate, burst) if rate else None
+        self.throttled = 0
+        self.failed = 0
+
+    def respond(self, method, path, payload):
+        if self.rate_limiter is not None:
+            retry_after = self.rate_limiter.acquire()
+            if retry_after:
+                with self.lock:
+                    self.throttled += 1
+                return 429, {'error': {'message': 'Too many requests.'}}, {
+                    'Retry-After': str(int(math.ceil(retry_after)))}
+
+        latency = self.latency.sample()
+        if latency:
+            time.sleep(latency)
+
+        error = self.pop_error(path)
+        if not error and self.error_rate and random.random() < self.error_rate:
+            error = random.choice(self.error_statuses)
+        if error:
+            with self.lock:
+                self.failed += 1
+            return error, {'error': {'message': 'Injected error.'}}, None
+
+        if method == 'POST' and path in ('instances', 'volumes'):
+            return self.create(path, payload)
+        if method == 'DELETE':
+            return self.delete(path)
+        if path not in self.routes:
+            return 404, {'error': {'message': 'Not found.'}}, None
+        return 200, self.routes[path], None
+
+    def create(self, collection, payload):
+        if not payload or not payload.get('name'):
+            return 400, {'error': {'message': 'Name is required.'}}, None
+        name = payload['name']
+        url = '%s/%s' % (collection, name)
+        if collection == 'volumes':
+            document = {'volume': {
+                'name': name,
+                'size': payload['size'],
+                'description': payload.get('description'),
+                'metadata': {'bootable': 'false', 'readonly': 'False'},
+                'status': 'available',
+                'attachments': [],
+            }}
+        else:
+            interface = payload['interfaces'][0]
+            addresses = [subnet['ip'] for subnet in interface['subnets']]
+            if interface.get('float'):
+                addresses.append(interface['float'])
+            document = {'instance': {
+                'name': name,
+                'flavor': payload['flavor'],
+                'status': 'ACTIVE',
+                'addresses': addresses,
+                'volumes': [],
+            }}
+
+        with self.lock:
+            if url in self.routes:
+                return 409, {'error': {'message': 'Resource already exists.'}}, None
+            self.routes[url] = document
+            # List document is replaced rather than mutated, so that concurrent readers are not affected.
+            items = self.routes[collection][collection] + [{'name': name}]
+            self.routes[collection] = {collection: items}
+        return 200, document, None
+
+    def delete(self, path):
+        collection = path.split('/', 1)[0]
+        with self.lock:
+            if collection not in ('instances', 'volumes') or self.routes.pop(path, None) is None:
+                return 404, {'error': {'message': 'Not found.'}}, None
+            name = path.split('/', 1)[1]
+            items = [item for item in self.routes[collection][collection] if item['name'] != name]
+            self.routes[collection] = {collection: items}
+        return 204, None, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Rijkscloud API for load testing.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--flavors', type=int, default=8)
+    parser.add_argument('--volumes', type=int, default=100)
+    parser.add_argument('--instances', type=int, default=100)
+    parser.add_argument('--networks', type=int, default=2)
+    parser.add_argument('--subnets', type=int, default=2, help='Number of subnets per network.')
+    parser.add_argument('--ips', type=int, default=254, help='Number of IP addresses per subnet.')
+    parser.add_argument('--floating-ips', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0, help='Median latency in seconds.')
+    parser.add_argument('--latency-sigma', type=float, default=0,
+                        help='Sigma of log-normal latency distribution, 0 means constant latency.')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='Share of requests which fail with 502, 503 or 504.')
+    parser.add_argument('--rate', type=float, default=0, help='Requests per second, 0 disables rate limiting.')
+    parser.add_argument('--burst', type=int, default=10)
+    parser.add_argument('--compression', action='store_true')
+    parser.add_argument('--etags', action='store_true')
+    args = parser.parse_args()
+
+    dataset = Dataset(
+        flavors=args.flavors, volumes=args.volumes, instances=args.instances, networks=args.networks,
+        subnets=args.subnets, ips=args.ips, floating_ips=args.floating_ips)
+    server = FakeRijkscloudServer(
+        dataset=dataset,
+        latency=Latency(args.latency, args.latency_sigma),
+        error_rate=args.error_rate,
+        rate=args.rate,
+        burst=args.burst,
+        address=(args.host, args.port),
+        compression=args.compression,
+        etags=args.etags,
+    )
+    print('Fake Rijkscloud API is listening on %s' % server.base_url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -23,7 +23,9 @@ class ServiceCreateTest(test.APITransactionTestCase):
     @mock.patch('waldur_rijkscloud.backend.RijkscloudClient')
     def test_credentials_are_passed_to_client(self, mocked_client):
         self.create_service()
-        mocked_client.assert_called_with(userid='admin', apikey='secret')
+        kwargs = mocked_client.call_args[1]
+        self.assertEqual(kwargs['userid'], 'admin')
+        self.assertEqual(kwargs['apikey'], 'secret')
 
     @mock.patch('waldur_rijkscloud.backend.RijkscloudBackend')
     def test_if_ping_fails_service_is_not_created(self, mocked_backend):
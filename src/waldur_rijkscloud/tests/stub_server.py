@@ -0,0 +1,178 @@
+from __future__ import unicode_literals
+
+import gzip
+import hashlib
+import io
+import json
+import threading
+import time
+
+from six.moves import BaseHTTPServer, socketserver
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def gzip_compress(content):
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb') as stream:
+        stream.write(content)
+    return buffer.getvalue()
+
+
+class StubRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    # HTTP/1.1 is required so that client is allowed to keep connection open.
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, avoid delayed ACK stalls on kept-alive connections.
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self):
+        self.handle_api_request('GET')
+
+    def do_POST(self):
+        self.handle_api_request('POST')
+
+    def do_DELETE(self):
+        self.handle_api_request('DELETE')
+
+    def handle_api_request(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length).decode('utf-8')) if length else None
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.in_flight += 1
+            self.server.max_in_flight = max(self.server.max_in_flight, self.server.in_flight)
+        try:
+            status, body, headers = self.server.respond(method, self.path.lstrip('/'), payload)
+            self.send_json(status, body, headers)
+        finally:
+            with self.server.lock:
+                self.server.in_flight -= 1
+
+    def send_json(self, status, body, headers=None):
+        content = json.dumps(body, sort_keys=True).encode('utf-8') if body is not None else b''
+        etag = None
+        if self.server.etags and status == 200:
+            etag = '"%s"' % hashlib.md5(content).hexdigest()
+            if self.headers.get('If-None-Match') == etag:
+                with self.server.lock:
+                    self.server.not_modified += 1
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        content_encoding = self.get_content_encoding() if content else None
+        if content_encoding == 'br':
+            content = brotli.compress(content)
+        elif content_encoding == 'gzip':
+            content = gzip_compress(content)
+        if content_encoding:
+            self.send_header('Content-Encoding', content_encoding)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if self.path.lstrip('/') in self.server.truncated:
+            # Connection is closed in the middle of body, as if it was broken.
+            content = content[:len(content) // 2]
+            self.close_connection = True
+        with self.server.lock:
+            self.server.bytes_sent += len(content)
+        self.wfile.write(content)
+
+    def get_content_encoding(self):
+        if not self.server.compression:
+            return None
+        accepted = [coding.strip() for coding in self.headers.get('Accept-Encoding', '').split(',')]
+        if 'br' in accepted and brotli is not None:
+            return 'br'
+        if 'gzip' in accepted:
+            return 'gzip'
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    Minimal local Rijkscloud API stand-in which serves static JSON documents
+    and counts accepted TCP connections, handled and concurrent requests.
+    Errors maps path to list of status codes returned by its next requests.
+    If compression is enabled, responses are compressed with brotli or gzip
+    if client accepts it; bytes_sent counts response body bytes on the wire.
+    Bodies of paths in truncated are cut in half and connection is closed.
+    Subclasses customize responses by overriding respond method.
+    """
+    daemon_threads = True
+    request_queue_size = 64
+
+    def __init__(self, routes=None, delay=0, etags=False, errors=None, compression=False, address=('127.0.0.1', 0)):
+        BaseHTTPServer.HTTPServer.__init__(self, address, StubRequestHandler)
+        self.routes = routes or {}
+        self.errors = errors or {}
+        self.truncated = set()
+        # Value of Retry-After header of injected 429 responses.
+        self.retry_after = None
+        self.compression = compression
+        self.bytes_sent = 0
+        self.delay = delay
+        self.etags = etags
+        self.not_modified = 0
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._thread = None
+
+    def respond(self, method, path, payload):
+        """
+        Return status, JSON body and extra headers of response to API request.
+        """
+        if self.delay:
+            time.sleep(self.delay)
+        error = self.pop_error(path)
+        if error:
+            headers = {'Retry-After': str(self.retry_after)} if error == 429 and self.retry_after else None
+            return error, {'error': {'message': 'Injected error.'}}, headers
+        if path not in self.routes:
+            return 404, {'error': {'message': 'Not found.'}}, None
+        return 200, self.routes[path], None
+
+    def pop_error(self, path):
+        with self.lock:
+            errors = self.errors.get(path)
+            return errors.pop(0) if errors else None
+
+    @property
+    def base_url(self):
+        return 'http://%s:%s' % self.server_address
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
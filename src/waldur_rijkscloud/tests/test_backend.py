@@ -1,12 +1,29 @@
 from __future__ import unicode_literals
 
+from datetime import timedelta
+
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import test
+import requests
 from six.moves import mock
 
 from . import factories, fixtures
 from .. import models
-from ..backend import RijkscloudBackend
+from ..backend import RijkscloudBackend, RijkscloudBackendError
+from ..circuitbreaker import CircuitOpenError
+from ..stats import SyncStats
+
+
+def assert_no_writes(test_case, func):
+    with CaptureQueriesContext(connection) as context:
+        func()
+    writes = [query['sql'] for query in context.captured_queries
+              if query['sql'].split()[0].upper() in ('INSERT', 'UPDATE', 'DELETE')]
+    test_case.assertEqual(writes, [])
 
 
 class BaseBackendTest(test.APITransactionTestCase):
@@ -59,12 +76,44 @@ class FlavorPullTest(BaseBackendTest):
         self.assertEqual(models.Flavor.objects.count(), 1)
         self.assertRaises(ObjectDoesNotExist, old_flavor.refresh_from_db)
 
+    def test_flavors_of_other_settings_are_not_removed(self):
+        other_flavor = factories.FlavorFactory(backend_id='stale')
+        self.backend.client.list_flavors.return_value = []
+        self.backend.pull_flavors()
+        other_flavor.refresh_from_db()
+
+    def test_existing_flavor_is_updated(self):
+        flavor = factories.FlavorFactory(
+            settings=self.fixture.service_settings, backend_id='general.8gb', name='general.8gb', cores=2)
+        self.backend.client.list_flavors.return_value = [
+            {
+                'name': 'general.8gb',
+                'vcpus': 4,
+                'ram': 8192
+            },
+        ]
+        self.backend.pull_flavors()
+        flavor.refresh_from_db()
+        self.assertEqual(flavor.cores, 4)
+        self.assertEqual(flavor.ram, 8192)
+
+    def test_unchanged_flavors_are_not_written(self):
+        self.backend.client.list_flavors.return_value = [
+            {
+                'name': 'general.8gb',
+                'vcpus': 4,
+                'ram': 8192
+            },
+        ]
+        self.backend.pull_flavors()
+        assert_no_writes(self, self.backend.pull_flavors)
+
 
 class VolumeImportTest(BaseBackendTest):
 
     def test_existing_volumes_are_skipped(self):
         factories.VolumeFactory(service_project_link=self.fixture.spl, backend_id='stale')
-        self.backend.client.list_volumes.return_value = [
+        self.backend.client.iter_volumes.return_value = [
             {
                 'attachments': [],
                 'description': None,
@@ -86,6 +135,13 @@ class VolumeImportTest(BaseBackendTest):
         self.assertEqual(len(volumes), 1)
         self.assertEqual(volumes[0].backend_id, 'new')
 
+    def test_registered_volumes_are_loaded_with_one_query(self):
+        factories.VolumeFactory.create_batch(5, service_project_link=self.fixture.spl)
+        resources = [models.Volume(backend_id='volume-%s' % i) for i in range(100)]
+        with self.assertNumQueries(1):
+            volumes = self.backend._get_backend_resource(models.Volume, resources)
+        self.assertEqual(len(volumes), 100)
+
     def test_import_volume(self):
         self.backend.client.get_volume.return_value = {
             'attachments': [],
@@ -101,6 +157,141 @@ class VolumeImportTest(BaseBackendTest):
         self.assertEqual(volume.runtime_state, 'available')
 
 
+class VolumePullTest(BaseBackendTest):
+    def setUp(self):
+        super(VolumePullTest, self).setUp()
+        self.volume = factories.VolumeFactory(
+            service_project_link=self.fixture.spl,
+            backend_id='data',
+            state=models.Volume.States.OK,
+        )
+        self.backend.client.iter_volumes.return_value = [
+            {
+                'attachments': [],
+                'description': None,
+                'metadata': {},
+                'name': 'data',
+                'size': 2,
+                'status': 'available'
+            }
+        ]
+
+    def test_volume_is_updated(self):
+        self.backend.pull_volumes()
+        self.volume.refresh_from_db()
+        self.assertEqual(self.volume.size, 2048)
+        self.assertEqual(self.volume.runtime_state, 'available')
+
+    def test_volume_changed_by_other_path_is_reconciled(self):
+        self.backend.pull_volumes()
+        # Runtime state poller writes the row between syncs, then backend returns to the previous state.
+        models.Volume.objects.filter(pk=self.volume.pk).update(runtime_state='in-use')
+        self.backend.pull_volumes()
+        self.volume.refresh_from_db()
+        self.assertEqual(self.volume.runtime_state, 'available')
+
+    def test_unchanged_volume_is_not_written(self):
+        self.backend.pull_volumes()
+        assert_no_writes(self, self.backend.pull_volumes)
+
+    def test_changed_volume_is_updated_after_previous_pull(self):
+        self.backend.pull_volumes()
+        self.backend.client.iter_volumes.return_value[0]['size'] = 3
+        self.backend.pull_volumes()
+        self.volume.refresh_from_db()
+        self.assertEqual(self.volume.size, 3072)
+
+    def test_erred_volume_is_recovered_even_if_it_has_not_changed(self):
+        self.backend.pull_volumes()
+        models.Volume.objects.filter(pk=self.volume.pk).update(state=models.Volume.States.ERRED)
+        self.backend.pull_volumes()
+        self.volume.refresh_from_db()
+        self.assertEqual(self.volume.state, models.Volume.States.OK)
+
+    def test_missing_volume_is_marked_as_erred(self):
+        self.backend.client.iter_volumes.return_value = []
+        self.backend.pull_volumes()
+        self.volume.refresh_from_db()
+        self.assertEqual(self.volume.state, models.Volume.States.ERRED)
+
+
+class ChunkedVolumePullTest(BaseBackendTest):
+    def setUp(self):
+        super(ChunkedVolumePullTest, self).setUp()
+        self.volumes = [
+            factories.VolumeFactory(
+                service_project_link=self.fixture.spl,
+                backend_id='volume-%s' % i,
+                state=models.Volume.States.OK,
+            )
+            for i in range(5)
+        ]
+        patcher = mock.patch.dict(settings.WALDUR_RIJKSCLOUD, CHUNK_SIZE=2)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_backend_volume(self, name):
+        return {
+            'metadata': {},
+            'name': name,
+            'size': 2,
+            'status': 'available'
+        }
+
+    def test_volumes_are_updated_by_chunks_and_missing_ones_are_erred(self):
+        self.backend.client.iter_volumes.return_value = iter([
+            self.get_backend_volume('volume-%s' % i) for i in (4, 0, 3, 1, 'new')])
+        self.backend.pull_volumes()
+
+        for volume in self.volumes:
+            volume.refresh_from_db()
+        self.assertEqual([volume.size for volume in self.volumes if volume.backend_id != 'volume-2'],
+                         [2048] * 4)
+        self.assertEqual(self.volumes[2].state, models.Volume.States.ERRED)
+        self.assertFalse(models.Volume.objects.filter(backend_id='new').exists())
+
+    def test_volumes_are_not_erred_if_listing_fails(self):
+        def iter_volumes():
+            yield self.get_backend_volume('volume-0')
+            yield self.get_backend_volume('volume-1')
+            yield self.get_backend_volume('volume-2')
+            raise requests.RequestException()
+
+        self.backend.client.iter_volumes.side_effect = iter_volumes
+        self.assertRaises(RijkscloudBackendError, self.backend.pull_volumes)
+        self.assertFalse(models.Volume.objects.filter(state=models.Volume.States.ERRED).exists())
+        self.volumes[0].refresh_from_db()
+        self.assertEqual(self.volumes[0].size, 2048)
+
+
+class AsyncFetchTest(BaseBackendTest):
+    def test_volumes_are_fetched_asynchronously(self):
+        self.backend.client.iter_volumes.return_value = [
+            {
+                'attachments': [],
+                'description': None,
+                'metadata': {},
+                'name': 'new',
+                'size': 2,
+                'status': 'available'
+            }
+        ]
+        volumes = self.backend.get_volumes_async().result()
+        self.assertEqual(len(volumes), 1)
+        self.assertEqual(volumes[0].size, 2048)
+
+    def test_backend_error_is_raised_from_future(self):
+        self.backend.client.list_networks.side_effect = requests.RequestException()
+        future = self.backend.list_networks_async()
+        self.assertRaises(RijkscloudBackendError, future.result)
+
+    def test_database_connection_of_worker_thread_is_closed(self):
+        self.backend.client.iter_volumes.return_value = []
+        with mock.patch('waldur_rijkscloud.backend.connection') as worker_connection:
+            self.backend.get_volumes_async().result()
+        worker_connection.close.assert_called_once_with()
+
+
 class FloatingIpPullTest(BaseBackendTest):
     def setUp(self):
         super(FloatingIpPullTest, self).setUp()
@@ -126,11 +317,21 @@ class FloatingIpPullTest(BaseBackendTest):
         self.assertEqual(models.FloatingIP.objects.count(), 2)
         self.assertRaises(ObjectDoesNotExist, old_fip.refresh_from_db)
 
+    def test_availability_of_existing_floating_ip_is_updated(self):
+        self.backend.pull_floating_ips()
+        self.backend.client.list_floatingips.return_value[0]['available'] = True
+        self.backend.pull_floating_ips()
+        self.assertTrue(models.FloatingIP.objects.get(backend_id='123.21.42.121').is_available)
+
+    def test_unchanged_floating_ips_are_not_written(self):
+        self.backend.pull_floating_ips()
+        assert_no_writes(self, self.backend.pull_floating_ips)
+
 
 class NetworkPullTest(BaseBackendTest):
     def setUp(self):
         super(NetworkPullTest, self).setUp()
-        self.backend.client.list_networks.return_value = [
+        self.backend_networks = [
             {
                 'name': 'service',
                 'subnets': [
@@ -154,13 +355,20 @@ class NetworkPullTest(BaseBackendTest):
 
             }
         ]
+        self.backend.client.list_network_names.side_effect = lambda: [
+            network['name'] for network in self.backend_networks]
+        self.backend.client.iter_subnets.side_effect = lambda network_names: (
+            (network['name'], subnet)
+            for network in self.backend_networks if network['name'] in network_names
+            for subnet in network['subnets']
+        )
 
     def test_new_network_is_created(self):
         self.backend.pull_networks()
         self.assertEqual(models.Network.objects.count(), 1)
 
     def test_gateway_ip_may_be_list_or_string(self):
-        self.backend.client.list_networks.return_value[0]['subnets'][0]['gateway_ip'] = '10.10.11.1'
+        self.backend_networks[0]['subnets'][0]['gateway_ip'] = '10.10.11.1'
         self.backend.pull_networks()
         self.assertEqual(models.SubNet.objects.count(), 1)
         self.assertEqual(models.SubNet.objects.last().gateway_ip, '10.10.11.1')
@@ -172,6 +380,13 @@ class NetworkPullTest(BaseBackendTest):
         self.assertEqual(models.Network.objects.count(), 1)
         self.assertRaises(ObjectDoesNotExist, old_net.refresh_from_db)
 
+    def test_existing_network_is_not_recreated(self):
+        network = factories.NetworkFactory(
+            settings=self.fixture.service_settings, backend_id='service', name='service')
+        self.backend.pull_networks()
+        self.assertEqual(models.Network.objects.get().pk, network.pk)
+        self.assertEqual(models.SubNet.objects.get().network, network)
+
     def test_new_subnet_is_created(self):
         self.backend.pull_networks()
         self.assertEqual(models.SubNet.objects.count(), 1)
@@ -208,6 +423,57 @@ class NetworkPullTest(BaseBackendTest):
         self.assertFalse(internal_ip.is_available)
 
 
+class InternalIPPullTest(BaseBackendTest):
+    def setUp(self):
+        super(InternalIPPullTest, self).setUp()
+        self.subnet = self.fixture.subnet
+
+    def get_backend_ips(self, count, available=True):
+        return [{'ip': '10.10.%s.%s' % (i // 250, i % 250 + 1), 'available': available}
+                for i in range(count)]
+
+    def count_queries(self, backend_ips):
+        with CaptureQueriesContext(connection) as context:
+            self.backend.pull_internal_ips(self.subnet, backend_ips)
+        return len(context.captured_queries)
+
+    def test_number_of_queries_does_not_depend_on_subnet_size(self):
+        self.count_queries(self.get_backend_ips(5))
+        small_subnet_queries = self.count_queries(self.get_backend_ips(5, available=False))
+        models.InternalIP.objects.all().delete()
+        self.count_queries(self.get_backend_ips(400))
+        large_subnet_queries = self.count_queries(self.get_backend_ips(400, available=False))
+        self.assertEqual(small_subnet_queries, large_subnet_queries)
+
+    def test_unchanged_ips_are_not_written(self):
+        backend_ips = self.get_backend_ips(100)
+        self.backend.pull_internal_ips(self.subnet, backend_ips)
+        self.assertEqual(self.count_queries(backend_ips), 1)
+
+    def test_new_ips_are_created(self):
+        self.backend.pull_internal_ips(self.subnet, self.get_backend_ips(100))
+        self.assertEqual(models.InternalIP.objects.filter(subnet=self.subnet).count(), 100)
+
+    def test_availability_is_updated(self):
+        self.backend.pull_internal_ips(self.subnet, self.get_backend_ips(10))
+        backend_ips = self.get_backend_ips(10)
+        backend_ips[3]['available'] = False
+        self.backend.pull_internal_ips(self.subnet, backend_ips)
+        self.assertEqual(models.InternalIP.objects.filter(is_available=False).count(), 1)
+        self.assertFalse(models.InternalIP.objects.get(backend_id=backend_ips[3]['ip']).is_available)
+
+    def test_stale_ips_are_deleted(self):
+        self.backend.pull_internal_ips(self.subnet, self.get_backend_ips(10))
+        self.backend.pull_internal_ips(self.subnet, self.get_backend_ips(6))
+        self.assertEqual(models.InternalIP.objects.filter(subnet=self.subnet).count(), 6)
+
+    def test_stale_ip_is_not_deleted_if_it_is_used_by_instance(self):
+        instance = self.fixture.instance
+        self.backend.pull_internal_ips(self.subnet, self.get_backend_ips(3))
+        instance.refresh_from_db()
+        self.assertTrue(models.InternalIP.objects.filter(pk=instance.internal_ip.pk).exists())
+
+
 class InstanceCreateTest(BaseBackendTest):
     def test_request_is_valid(self):
         vm = factories.InstanceFactory(
@@ -240,6 +506,26 @@ class InstanceCreateTest(BaseBackendTest):
         })
 
 
+class InstanceDeleteTest(BaseBackendTest):
+    def test_cached_addresses_are_invalidated(self):
+        self.backend.catalogue = mock.Mock()
+        self.backend.delete_instance(self.fixture.instance)
+        self.backend.catalogue.invalidate.assert_called_once_with('floating_ips')
+
+    def test_instance_is_deleted_if_api_returns_404(self):
+        self.backend.client.get_instance.side_effect = requests.HTTPError(response=mock.Mock(status_code=404))
+        self.assertTrue(self.backend.is_instance_deleted(self.fixture.instance))
+
+    def test_backend_error_is_raised_if_circuit_is_open(self):
+        self.backend.client.get_instance.side_effect = CircuitOpenError('Circuit breaker is open.')
+        self.assertRaises(RijkscloudBackendError, self.backend.is_instance_deleted, self.fixture.instance)
+
+    def test_backend_error_is_raised_if_volume_request_times_out(self):
+        volume = factories.VolumeFactory(service_project_link=self.fixture.spl)
+        self.backend.client.get_volume.side_effect = requests.Timeout()
+        self.assertRaises(RijkscloudBackendError, self.backend.is_volume_deleted, volume)
+
+
 class InstanceImportTest(BaseBackendTest):
     def test_internal_and_floating_ips_are_mapped(self):
         internal_ip = self.fixture.internal_ip
@@ -251,12 +537,176 @@ class InstanceImportTest(BaseBackendTest):
             'name': 'test-vm'
         }
 
-        self.backend.client.get_flavor.return_value = {
+        self.backend.client.list_flavors.return_value = [{
             'name': 'std.2gb',
             'ram': 2048,
             'vcpus': 1
-        }
+        }]
 
         instance = self.backend.import_instance('test-vm', service_project_link=self.fixture.spl)
         self.assertEqual(instance.internal_ip, internal_ip)
         self.assertEqual(instance.floating_ip, floating_ip)
+        self.assertEqual(instance.flavor_name, 'std.2gb')
+        self.assertEqual(instance.ram, 2048)
+
+
+class SyncRunTest(BaseBackendTest):
+    def setUp(self):
+        super(SyncRunTest, self).setUp()
+        mock.patch.dict(settings.WALDUR_RIJKSCLOUD, SYNC_RUNS=True).start()
+        self.backend.client.list_flavors.return_value = [{'name': 'std.2gb', 'ram': 2048, 'vcpus': 1}]
+        self.backend.client.list_floatingips.return_value = []
+        self.backend.client.list_network_names.return_value = []
+        self.backend.client.iter_subnets.return_value = []
+        self.backend.client.iter_volumes.return_value = []
+        self.backend.client.iter_instances.return_value = []
+
+    def test_sync_run_is_stored(self):
+        self.backend.sync()
+        sync_run = models.SyncRun.objects.get(settings=self.fixture.service_settings)
+        self.assertTrue(sync_run.succeeded)
+        self.assertEqual(sync_run.created_rows, 1)
+        self.assertGreater(sync_run.queries, 0)
+        self.assertEqual({phase['name'] for phase in sync_run.phases},
+                         {'flavors', 'floating_ips', 'networks', 'volumes', 'instances'})
+
+    def test_each_query_of_sync_phase_is_counted_once(self):
+        for name in ('pull_floating_ips', 'pull_networks', 'pull_volumes', 'pull_instances'):
+            mock.patch.object(self.backend, name, lambda: None).start()
+        mock.patch.object(self.backend, 'pull_flavors', lambda: [
+            models.Flavor.objects.count() for _ in range(3)]).start()
+        self.backend.sync()
+        sync_run = models.SyncRun.objects.get(settings=self.fixture.service_settings)
+        self.assertEqual(sync_run.queries, 3)
+
+    def test_api_requests_are_counted(self):
+        self.backend.client.add_observer.side_effect = lambda stats: stats.observe('get', 'flavors', 200, 0.1, 100)
+        self.backend.sync()
+        sync_run = models.SyncRun.objects.get(settings=self.fixture.service_settings)
+        self.assertEqual(sync_run.requests, 1)
+        self.assertEqual(sync_run.transferred_bytes, 100)
+
+    def test_failed_sync_run_is_stored(self):
+        self.backend.client.iter_volumes.side_effect = requests.RequestException('Volumes are not available.')
+        self.assertRaises(RijkscloudBackendError, self.backend.sync)
+        sync_run = models.SyncRun.objects.get(settings=self.fixture.service_settings)
+        self.assertFalse(sync_run.succeeded)
+        self.assertEqual(sync_run.error_message, 'Volumes are not available.')
+
+    def test_old_sync_runs_are_deleted(self):
+        old_run = factories.SyncRunFactory(
+            settings=self.fixture.service_settings, started=timezone.now() - timedelta(days=365))
+        self.backend.sync()
+        self.assertFalse(models.SyncRun.objects.filter(pk=old_run.pk).exists())
+
+    def test_counted_queries_are_captured_by_outer_context(self):
+        stats = SyncStats()
+        with CaptureQueriesContext(connection) as context:
+            with stats.count_queries():
+                list(models.SyncRun.objects.all())
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertEqual(stats.counters['queries'], 1)
+
+    def test_counted_queries_are_not_stored_if_they_are_not_logged(self):
+        stats = SyncStats()
+        logged = len(connection.queries_log)
+        with stats.count_queries():
+            list(models.SyncRun.objects.all())
+        self.assertEqual(stats.counters['queries'], 1)
+        self.assertEqual(len(connection.queries_log), logged)
+
+
+class CatalogueCacheTest(BaseBackendTest):
+    def setUp(self):
+        super(CatalogueCacheTest, self).setUp()
+        self.backend.client.list_flavors.return_value = [{'name': 'std.2gb', 'ram': 2048, 'vcpus': 1}]
+
+    def test_flavors_are_fetched_once_per_sync(self):
+        self.backend.sync()
+        self.assertEqual(self.backend.client.list_flavors.call_count, 1)
+
+    def test_flavors_are_fetched_once_within_context(self):
+        with self.backend.catalogue_cache():
+            self.backend.ping()
+            self.backend.pull_flavors()
+            self.backend.get_instances()
+        self.assertEqual(self.backend.client.list_flavors.call_count, 1)
+
+    def test_cache_is_dropped_after_context(self):
+        with self.backend.catalogue_cache():
+            self.backend.ping()
+        self.backend.ping()
+        self.assertEqual(self.backend.client.list_flavors.call_count, 2)
+
+
+class PingTest(BaseBackendTest):
+    def test_ping_reports_open_circuit(self):
+        self.backend.client.list_flavors.side_effect = CircuitOpenError(
+            'Circuit breaker is open after 5 consecutive failures.')
+        self.assertFalse(self.backend.ping())
+        with self.assertRaises(RijkscloudBackendError) as cm:
+            self.backend.ping(raise_exception=True)
+        self.assertIn('Circuit breaker is open', str(cm.exception))
+
+    def test_circuit_breaker_is_shared_by_backends_of_the_same_settings(self):
+        other_backend = RijkscloudBackend(settings=self.fixture.service_settings)
+        self.assertIs(self.backend.circuit_breaker, other_backend.circuit_breaker)
+        self.assertEqual(self.backend.get_circuit_breaker_state()['state'], 'closed')
+
+
+class BaseUrlTest(BaseBackendTest):
+    def test_public_api_is_used_by_default(self):
+        self.fixture.service_settings.backend_url = None
+        self.assertEqual(RijkscloudBackend.get_base_urls(self.fixture.service_settings),
+                         ['https://api.ix.rijkscloud.nl'])
+
+    def test_backend_url_is_followed_by_mirror_urls(self):
+        service_settings = self.fixture.service_settings
+        service_settings.backend_url = 'https://api.example.com/'
+        service_settings.options = {'mirror_urls': 'https://mirror.example.com, https://api.example.com'}
+        self.assertEqual(RijkscloudBackend.get_base_urls(service_settings),
+                         ['https://api.example.com', 'https://mirror.example.com'])
+
+    def test_throttle_is_shared_by_account_of_the_same_api(self):
+        service_settings = self.fixture.service_settings
+        service_settings.backend_url = 'https://api.example.com'
+        throttle = RijkscloudBackend.get_throttle(service_settings)
+        service_settings.backend_url = 'https://other.example.com'
+        self.assertIsNot(RijkscloudBackend.get_throttle(service_settings), throttle)
+
+
+class InstanceListTest(BaseBackendTest):
+    def setUp(self):
+        super(InstanceListTest, self).setUp()
+        self.backend.client.list_flavors.return_value = [{'name': 'std.2gb', 'ram': 2048, 'vcpus': 1}]
+
+    def get_backend_instances(self, count):
+        internal_ip = self.fixture.internal_ip
+        floating_ip = self.fixture.floating_ip
+        return [{
+            'addresses': [internal_ip.address, floating_ip.address],
+            'flavor': 'std.2gb',
+            'name': 'vm-%s' % i,
+        } for i in range(count)]
+
+    def count_queries(self, count):
+        self.backend.client.iter_instances.return_value = self.get_backend_instances(count)
+        with CaptureQueriesContext(connection) as context:
+            self.backend.get_instances()
+        return len(context.captured_queries)
+
+    def test_number_of_queries_does_not_depend_on_number_of_instances(self):
+        self.assertEqual(self.count_queries(2), self.count_queries(50))
+
+    def test_internal_and_floating_ips_are_mapped(self):
+        self.backend.client.iter_instances.return_value = self.get_backend_instances(1)
+        instance = self.backend.get_instances()[0]
+        self.assertEqual(instance.internal_ip, self.fixture.internal_ip)
+        self.assertEqual(instance.floating_ip, self.fixture.floating_ip)
+
+    def test_unknown_floating_ip_is_not_mapped(self):
+        backend_instances = self.get_backend_instances(1)
+        backend_instances[0]['addresses'][1] = '8.8.8.8'
+        self.backend.client.iter_instances.return_value = backend_instances
+        instance = self.backend.get_instances()[0]
+        self.assertIsNone(instance.floating_ip)
@@ -0,0 +1,84 @@
+from __future__ import unicode_literals
+
+import threading
+import unittest
+
+from six.moves import mock
+
+from ..cache import CatalogueCache, LocMemStore
+
+
+class LocMemStoreTest(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        store = LocMemStore(max_size=2)
+        store.set('a', 1, 60)
+        store.set('b', 2, 60)
+        store.get('a')
+        store.set('c', 3, 60)
+        self.assertEqual(store.get('a'), 1)
+        self.assertIsNone(store.get('b'))
+        self.assertEqual(store.get('c'), 3)
+
+    @mock.patch('waldur_rijkscloud.cache.time')
+    def test_expired_entry_is_not_returned(self, mocked_time):
+        mocked_time.time.return_value = 100
+        store = LocMemStore()
+        store.set('a', 1, 10)
+        mocked_time.time.return_value = 111
+        self.assertIsNone(store.get('a'))
+
+
+@mock.patch('waldur_rijkscloud.cache.time')
+class CatalogueCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = CatalogueCache(
+            LocMemStore(), 'test', ttls={'flavors': 60, 'networks': 0}, stale_ttl=30)
+        self.fetch = mock.Mock(return_value=['flavor'])
+
+    def test_fresh_entry_is_returned_without_fetching(self, mocked_time):
+        mocked_time.time.return_value = 100
+        self.cache.get('flavors', self.fetch)
+        mocked_time.time.return_value = 150
+        self.assertEqual(self.cache.get('flavors', self.fetch), ['flavor'])
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_endpoint_without_ttl_is_not_cached(self, mocked_time):
+        mocked_time.time.return_value = 100
+        self.cache.get('networks', self.fetch)
+        self.cache.get('networks', self.fetch)
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_outdated_entry_is_fetched_if_stale_data_is_not_allowed(self, mocked_time):
+        mocked_time.time.return_value = 100
+        self.cache.get('flavors', self.fetch)
+        mocked_time.time.return_value = 170
+        self.fetch.return_value = ['new flavor']
+        self.assertEqual(self.cache.get('flavors', self.fetch), ['new flavor'])
+
+    def test_stale_entry_is_returned_and_refreshed_in_background(self, mocked_time):
+        mocked_time.time.return_value = 100
+        self.cache.get('flavors', self.fetch)
+        mocked_time.time.return_value = 170
+
+        refreshed = threading.Event()
+
+        def fetch():
+            refreshed.set()
+            return ['new flavor']
+
+        self.assertEqual(self.cache.get('flavors', fetch, allow_stale=True), ['flavor'])
+        self.assertTrue(refreshed.wait(5))
+
+    def test_entry_is_fetched_after_invalidation(self, mocked_time):
+        mocked_time.time.return_value = 100
+        self.cache.get('flavors', self.fetch)
+        self.cache.invalidate('flavors')
+        self.cache.get('flavors', self.fetch)
+        self.assertEqual(self.fetch.call_count, 2)
+
+    def test_entries_of_different_namespaces_are_separated(self, mocked_time):
+        mocked_time.time.return_value = 100
+        store = LocMemStore()
+        CatalogueCache(store, 'first', ttls={'flavors': 60}).get('flavors', self.fetch)
+        CatalogueCache(store, 'second', ttls={'flavors': 60}).get('flavors', self.fetch)
+        self.assertEqual(self.fetch.call_count, 2)
@@ -0,0 +1,67 @@
+from __future__ import unicode_literals
+
+import unittest
+
+from six.moves import mock
+
+from .. import circuitbreaker
+from ..cache import LocMemStore
+
+
+@mock.patch('waldur_rijkscloud.circuitbreaker.time')
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.breaker = circuitbreaker.CircuitBreaker('test', failure_threshold=3, recovery_timeout=30)
+
+    def fail(self, count):
+        for _ in range(count):
+            self.breaker.before_request()
+            self.breaker.record(success=False)
+
+    def test_circuit_is_opened_after_consecutive_failures(self, mocked_time):
+        mocked_time.time.return_value = 100
+        self.fail(3)
+        self.assertEqual(self.breaker.get_state()['state'], 'open')
+        self.assertRaises(circuitbreaker.CircuitOpenError, self.breaker.before_request)
+
+    def test_success_resets_failures(self, mocked_time):
+        mocked_time.time.return_value = 100
+        self.fail(2)
+        self.breaker.record(success=True)
+        self.fail(2)
+        self.assertEqual(self.breaker.get_state(), {'state': 'closed', 'failures': 2, 'retry_after': 0})
+
+    def test_only_one_probe_is_allowed_when_circuit_is_half_open(self, mocked_time):
+        mocked_time.time.return_value = 100
+        self.fail(3)
+        mocked_time.time.return_value = 131
+        self.assertEqual(self.breaker.get_state()['state'], 'half-open')
+        self.breaker.before_request()
+        self.assertRaises(circuitbreaker.CircuitOpenError, self.breaker.before_request)
+
+    def test_circuit_is_closed_if_probe_succeeds(self, mocked_time):
+        mocked_time.time.return_value = 100
+        self.fail(3)
+        mocked_time.time.return_value = 131
+        self.breaker.before_request()
+        self.breaker.record(success=True)
+        self.assertEqual(self.breaker.get_state()['state'], 'closed')
+        self.breaker.before_request()
+
+    def test_circuit_is_opened_again_if_probe_fails(self, mocked_time):
+        mocked_time.time.return_value = 100
+        self.fail(3)
+        mocked_time.time.return_value = 131
+        self.fail(1)
+        state = self.breaker.get_state()
+        self.assertEqual(state['state'], 'open')
+        self.assertEqual(state['retry_after'], 30)
+
+    def test_state_is_shared_through_store(self, mocked_time):
+        mocked_time.time.return_value = 100
+        store = LocMemStore()
+        first = circuitbreaker.CircuitBreaker('shared', store, failure_threshold=1)
+        second = circuitbreaker.CircuitBreaker('shared', store, failure_threshold=1)
+        first.before_request()
+        first.record(success=False)
+        self.assertRaises(circuitbreaker.CircuitOpenError, second.before_request)
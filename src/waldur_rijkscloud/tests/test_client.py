@@ -0,0 +1,485 @@
+from __future__ import unicode_literals
+
+import threading
+import time
+import unittest
+
+import requests
+
+from .. import circuitbreaker, client, metrics, throttling
+from .stub_server import StubServer
+
+
+class BaseClientTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StubServer({
+            'flavors': {'flavors': [{'name': 'general.2gb', 'vcpus': 1, 'ram': 2048}]},
+        }).start()
+
+    def tearDown(self):
+        self.server.stop()
+        client.close_sessions()
+
+    def get_client(self, **kwargs):
+        return client.RijkscloudClient(
+            apikey='secret', userid='admin', base_url=self.server.base_url, **kwargs)
+
+
+class SessionTest(BaseClientTest):
+    def test_connection_is_reused_between_requests(self):
+        rijkscloud = self.get_client()
+        for _ in range(10):
+            rijkscloud.list_flavors()
+        self.assertEqual(self.server.requests, 10)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_connection_is_reused_between_clients_of_the_same_account(self):
+        self.get_client().list_flavors()
+        self.get_client().list_flavors()
+        self.assertEqual(self.server.connections, 1)
+
+    def test_session_is_not_shared_between_accounts(self):
+        self.get_client().list_flavors()
+        client.RijkscloudClient(
+            apikey='another', userid='another', base_url=self.server.base_url).list_flavors()
+        self.assertEqual(self.server.connections, 2)
+
+    def test_connection_is_closed_if_keep_alive_is_disabled(self):
+        rijkscloud = self.get_client(keep_alive=False)
+        for _ in range(3):
+            rijkscloud.list_flavors()
+        self.assertEqual(self.server.connections, 3)
+
+
+class ConcurrentFetchTest(BaseClientTest):
+    def setUp(self):
+        super(ConcurrentFetchTest, self).setUp()
+        names = ['vm-%s' % i for i in range(20)]
+        self.server.routes['instances'] = {'instances': [{'name': name} for name in names]}
+        for name in names:
+            self.server.routes['instances/%s' % name] = {'instance': {'name': name}}
+        self.server.delay = 0.01
+        self.names = names
+
+    def test_result_order_is_preserved(self):
+        instances = self.get_client(max_workers=5).list_instances()
+        self.assertEqual([instance['name'] for instance in instances], self.names)
+
+    def test_number_of_requests_in_flight_is_bounded(self):
+        self.get_client(max_workers=5).list_instances()
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLessEqual(self.server.max_in_flight, 5)
+
+    def test_requests_are_serial_by_default(self):
+        self.get_client().list_instances()
+        self.assertEqual(self.server.max_in_flight, 1)
+
+    def test_error_is_raised_if_detail_request_fails(self):
+        del self.server.routes['instances/vm-7']
+        with self.assertRaises(requests.HTTPError) as cm:
+            self.get_client(max_workers=5).list_instances()
+        self.assertEqual(cm.exception.response.status_code, 404)
+
+
+class AsyncClientTest(BaseClientTest):
+    def test_method_returns_future_with_the_same_result(self):
+        rijkscloud = client.AsyncRijkscloudClient(
+            apikey='secret', userid='admin', base_url=self.server.base_url)
+        future = rijkscloud.list_flavors()
+        self.assertEqual(future.result(), self.get_client().list_flavors())
+
+    def test_accounts_are_queried_concurrently(self):
+        self.server.delay = 0.05
+        results = [
+            client.AsyncRijkscloudClient(
+                apikey='key-%s' % i, userid='user-%s' % i, base_url=self.server.base_url).list_flavors()
+            for i in range(5)
+        ]
+        for future in results:
+            future.result()
+        self.assertGreater(self.server.max_in_flight, 1)
+
+    def test_error_is_raised_from_future(self):
+        rijkscloud = client.AsyncRijkscloudClient(
+            apikey='secret', userid='admin', base_url=self.server.base_url)
+        future = rijkscloud.get_instance('missing')
+        self.assertRaises(requests.HTTPError, future.result)
+
+
+class NetworkTreeFetchTest(BaseClientTest):
+    def setUp(self):
+        super(NetworkTreeFetchTest, self).setUp()
+        routes = self.server.routes
+        routes['networks'] = {'networks': [{'name': 'net-%s' % i} for i in range(3)]}
+        for i in range(3):
+            network = 'net-%s' % i
+            subnets = ['subnet-%s-%s' % (i, j) for j in range(4)]
+            routes['networks/%s/subnets' % network] = {'subnets': [{'name': name} for name in subnets]}
+            for subnet in subnets:
+                url = 'networks/%s/subnets/%s' % (network, subnet)
+                routes[url] = {'subnet': {'cidr': '10.0.%s.0/24' % i}}
+                routes[url + '/ips'] = {'ips': [{'ip': '10.0.%s.1' % i, 'available': True}]}
+        self.server.delay = 0.01
+
+    def test_all_subnets_are_yielded_with_ips(self):
+        rijkscloud = self.get_client(max_workers=5)
+        result = list(rijkscloud.iter_subnets(rijkscloud.list_network_names()))
+        self.assertEqual(len(result), 12)
+        for network_name, subnet in result:
+            self.assertTrue(subnet['name'].startswith(network_name.replace('net', 'subnet')))
+            self.assertEqual(subnet['cidr'][:7], subnet['ips'][0]['ip'][:7])
+
+    def test_subnets_are_fetched_in_parallel(self):
+        rijkscloud = self.get_client(max_workers=5)
+        list(rijkscloud.iter_subnets(rijkscloud.list_network_names()))
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLessEqual(self.server.max_in_flight, 5)
+
+    def test_tree_matches_serial_network_listing(self):
+        rijkscloud = self.get_client(max_workers=5)
+        expected = {(network['name'], subnet['name']): subnet
+                    for network in rijkscloud.list_networks() for subnet in network['subnets']}
+        actual = {(network_name, subnet['name']): subnet
+                  for network_name, subnet in rijkscloud.iter_subnets(rijkscloud.list_network_names())}
+        self.assertEqual(actual, expected)
+
+    def test_error_is_raised_if_subnet_request_fails(self):
+        del self.server.routes['networks/net-1/subnets/subnet-1-2/ips']
+        rijkscloud = self.get_client(max_workers=5)
+        with self.assertRaises(requests.HTTPError):
+            list(rijkscloud.iter_subnets(rijkscloud.list_network_names()))
+
+
+class ConditionalRequestTest(BaseClientTest):
+    def setUp(self):
+        super(ConditionalRequestTest, self).setUp()
+        self.server.routes['volumes/data'] = {'volume': {'name': 'data', 'size': 1}}
+
+    def test_previous_response_is_reused_if_resource_is_not_modified(self):
+        self.server.etags = True
+        rijkscloud = self.get_client(conditional_requests=True)
+        first = rijkscloud.get_volume('data')
+
+        second = rijkscloud.get_volume('data')
+        self.assertEqual(first, second)
+        self.assertEqual(self.server.not_modified, 1)
+
+    def test_modified_resource_is_fetched(self):
+        self.server.etags = True
+        rijkscloud = self.get_client(conditional_requests=True)
+        rijkscloud.get_volume('data')
+        self.server.routes['volumes/data'] = {'volume': {'name': 'data', 'size': 2}}
+        self.assertEqual(rijkscloud.get_volume('data')['size'], 2)
+        self.assertEqual(self.server.not_modified, 0)
+
+    def test_request_is_not_conditional_if_server_does_not_return_validators(self):
+        rijkscloud = self.get_client(conditional_requests=True)
+        rijkscloud.get_volume('data')
+        self.assertEqual(rijkscloud.get_volume('data')['size'], 1)
+        self.assertEqual(self.server.not_modified, 0)
+
+    def test_cached_response_is_not_changed_by_caller(self):
+        self.server.etags = True
+        rijkscloud = self.get_client(conditional_requests=True)
+        rijkscloud.get_volume('data')['size'] = 100
+        rijkscloud.get_volume('data')['size'] = 100
+        self.assertEqual(rijkscloud.get_volume('data')['size'], 1)
+
+
+class ThrottlingTest(BaseClientTest):
+    def test_requests_are_reported_to_throttle(self):
+        throttle = throttling.Throttle(max_concurrency=4)
+        self.get_client(throttle=throttle).list_flavors()
+        self.assertEqual(throttle.get_metrics()['requests'], 1)
+        self.assertEqual(throttle.get_metrics()['throttled_requests'], 0)
+
+    def test_concurrency_is_limited_by_throttle(self):
+        self.server.routes['instances'] = {'instances': [{'name': 'vm-%s' % i} for i in range(10)]}
+        for i in range(10):
+            self.server.routes['instances/vm-%s' % i] = {'instance': {'name': 'vm-%s' % i}}
+        self.server.delay = 0.01
+        throttle = throttling.Throttle(max_concurrency=2)
+        self.get_client(max_workers=5, throttle=throttle).list_instances()
+        self.assertLessEqual(self.server.max_in_flight, 2)
+
+
+class RetryTest(BaseClientTest):
+    def get_client(self, **kwargs):
+        kwargs.setdefault('retry_policy', client.RetryPolicy(retries=2, backoff_factor=0.01))
+        return super(RetryTest, self).get_client(**kwargs)
+
+    def test_get_request_is_retried_if_api_is_temporarily_unavailable(self):
+        self.server.errors['flavors'] = [502, 503]
+        self.assertEqual(len(self.get_client().list_flavors()), 1)
+        self.assertEqual(self.server.requests, 3)
+
+    def test_error_is_raised_if_retries_are_exhausted(self):
+        self.server.errors['flavors'] = [502, 502, 502]
+        with self.assertRaises(requests.HTTPError) as cm:
+            self.get_client().list_flavors()
+        self.assertEqual(cm.exception.response.status_code, 502)
+        self.assertEqual(self.server.requests, 3)
+
+    def test_client_error_is_not_retried(self):
+        with self.assertRaises(requests.HTTPError):
+            self.get_client().get_instance('missing')
+        self.assertEqual(self.server.requests, 1)
+
+    def test_post_request_is_not_retried(self):
+        self.server.errors['volumes'] = [503]
+        with self.assertRaises(requests.HTTPError):
+            self.get_client().create_volume({'name': 'data', 'size': 1})
+        self.assertEqual(self.server.requests, 1)
+
+    def test_retry_waits_for_retry_after_of_throttled_response(self):
+        self.server.errors['flavors'] = [429]
+        self.server.retry_after = 1
+        started = time.time()
+        self.assertEqual(len(self.get_client().list_flavors()), 1)
+        self.assertGreaterEqual(time.time() - started, 1)
+
+    def test_retry_after_beyond_deadline_is_not_waited(self):
+        self.server.errors['flavors'] = [429]
+        self.server.retry_after = 60
+        rijkscloud = self.get_client()
+        with rijkscloud.deadline(5):
+            with self.assertRaises(requests.HTTPError) as cm:
+                rijkscloud.list_flavors()
+        self.assertEqual(cm.exception.response.status_code, 429)
+
+    def test_delete_is_successful_if_resource_is_missing_on_retry(self):
+        self.server.errors['volumes/data'] = [502]
+        self.assertIsNone(self.get_client().delete_volume('data'))
+        self.assertEqual(self.server.requests, 2)
+
+    def test_delete_of_missing_resource_fails_without_retry(self):
+        with self.assertRaises(requests.HTTPError):
+            self.get_client().delete_volume('data')
+
+    def test_requests_are_not_retried_by_default(self):
+        self.server.errors['flavors'] = [502]
+        with self.assertRaises(requests.HTTPError):
+            super(RetryTest, self).get_client().list_flavors()
+        self.assertEqual(self.server.requests, 1)
+
+
+class TimeoutTest(BaseClientTest):
+    def test_request_fails_if_read_timeout_is_exceeded(self):
+        self.server.delay = 0.2
+        with self.assertRaises(requests.Timeout):
+            self.get_client(timeout=(1, 0.05)).list_flavors()
+
+    def test_request_fails_if_deadline_is_exceeded(self):
+        rijkscloud = self.get_client()
+        with rijkscloud.deadline(0):
+            self.assertRaises(client.DeadlineExceeded, rijkscloud.list_flavors)
+        self.assertEqual(self.server.requests, 0)
+
+    def test_read_timeout_is_limited_by_deadline(self):
+        self.server.delay = 0.2
+        rijkscloud = self.get_client(retry_policy=client.RetryPolicy(retries=5, backoff_factor=0.01))
+        started = time.time()
+        with rijkscloud.deadline(0.1):
+            self.assertRaises(requests.Timeout, rijkscloud.list_flavors)
+        self.assertLess(time.time() - started, 0.2)
+
+    def test_nested_deadline_does_not_extend_outer_one(self):
+        rijkscloud = self.get_client()
+        with rijkscloud.deadline(0):
+            with rijkscloud.deadline(60):
+                self.assertRaises(client.DeadlineExceeded, rijkscloud.list_flavors)
+        self.assertEqual(len(rijkscloud.list_flavors()), 1)
+
+    def test_concurrent_deadlines_do_not_affect_each_other(self):
+        rijkscloud = self.get_client()
+        first_entered, second_entered, first_exited = [threading.Event() for _ in range(3)]
+        remaining = {}
+
+        def first():
+            with rijkscloud.deadline(1):
+                first_entered.set()
+                second_entered.wait(5)
+                remaining['first'] = client.get_deadline() - time.time()
+            first_exited.set()
+
+        def second():
+            first_entered.wait(5)
+            with rijkscloud.deadline(600):
+                second_entered.set()
+                remaining['second'] = client.get_deadline() - time.time()
+                first_exited.wait(5)
+
+        with rijkscloud.deadline(3600):
+            threads = [threading.Thread(target=client.bind_context(target)) for target in (first, second)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertGreater(client.get_deadline() - time.time(), 3500)
+        self.assertIsNone(client.get_deadline())
+        self.assertLessEqual(remaining['first'], 1)
+        self.assertGreater(remaining['second'], 500)
+
+    def test_deadline_applies_to_worker_threads_of_client(self):
+        rijkscloud = self.get_client(max_workers=4)
+        with rijkscloud.deadline(0):
+            self.assertRaises(client.DeadlineExceeded, rijkscloud._map, rijkscloud.get_volume, ['first', 'second'])
+        self.assertEqual(self.server.requests, 0)
+
+
+class CircuitBreakerTest(BaseClientTest):
+    def test_requests_fail_fast_while_circuit_is_open(self):
+        breaker = circuitbreaker.CircuitBreaker('test', failure_threshold=2)
+        rijkscloud = self.get_client(circuit_breaker=breaker)
+        self.server.errors['flavors'] = [502, 502]
+        for _ in range(2):
+            self.assertRaises(requests.HTTPError, rijkscloud.list_flavors)
+
+        self.assertRaises(circuitbreaker.CircuitOpenError, rijkscloud.list_flavors)
+        self.assertEqual(self.server.requests, 2)
+
+    def test_client_errors_are_not_counted_as_failures(self):
+        breaker = circuitbreaker.CircuitBreaker('test', failure_threshold=1)
+        rijkscloud = self.get_client(circuit_breaker=breaker)
+        self.assertRaises(requests.HTTPError, rijkscloud.get_instance, 'missing')
+        self.assertEqual(breaker.get_state()['state'], 'closed')
+
+    def test_retries_stop_when_circuit_is_opened(self):
+        breaker = circuitbreaker.CircuitBreaker('test', failure_threshold=2)
+        rijkscloud = self.get_client(
+            circuit_breaker=breaker, retry_policy=client.RetryPolicy(retries=5, backoff_factor=0.01))
+        self.server.errors['flavors'] = [503] * 5
+        self.assertRaises(circuitbreaker.CircuitOpenError, rijkscloud.list_flavors)
+        self.assertEqual(self.server.requests, 2)
+
+
+class ChunkedFetchTest(BaseClientTest):
+    def setUp(self):
+        super(ChunkedFetchTest, self).setUp()
+        names = ['volume-%s' % i for i in range(25)]
+        self.server.routes['volumes'] = {'volumes': [{'name': name} for name in names]}
+        for name in names:
+            self.server.routes['volumes/%s' % name] = {'volume': {'name': name, 'size': 1.5}}
+        self.names = names
+
+    def test_details_are_fetched_by_chunks(self):
+        volumes = self.get_client(max_workers=5, chunk_size=10).iter_volumes()
+        next(volumes)
+        # List request and details of the first chunk.
+        self.assertEqual(self.server.requests, 11)
+        self.assertEqual([volume['name'] for volume in volumes], self.names[1:])
+        self.assertEqual(self.server.requests, 26)
+
+    @unittest.skipIf(client.ijson is None, 'ijson is not installed.')
+    def test_streamed_list_matches_regular_one(self):
+        streamed = self.get_client(streaming=True, chunk_size=10).list_volumes()
+        self.assertEqual(streamed, self.get_client().list_volumes())
+        self.assertEqual(streamed[0]['size'], 1.5)
+
+    @unittest.skipIf(client.ijson is None, 'ijson is not installed.')
+    def test_error_is_raised_if_streamed_list_request_fails(self):
+        del self.server.routes['volumes']
+        with self.assertRaises(requests.HTTPError):
+            self.get_client(streaming=True).list_volumes()
+
+    @unittest.skipIf(client.ijson is None, 'ijson is not installed.')
+    def test_connection_error_is_raised_if_streamed_body_is_truncated(self):
+        self.server.truncated.add('volumes')
+        breaker = circuitbreaker.CircuitBreaker('test', failure_threshold=1)
+        rijkscloud = self.get_client(streaming=True, circuit_breaker=breaker)
+        with self.assertRaises(requests.ConnectionError):
+            list(rijkscloud._iter('volumes', 'volumes'))
+        self.assertEqual(breaker.get_state()['state'], 'open')
+
+
+class CompressionTest(BaseClientTest):
+    def setUp(self):
+        super(CompressionTest, self).setUp()
+        self.server.compression = True
+        self.server.routes['volumes'] = {'volumes': [{'name': 'volume-%s' % i} for i in range(100)]}
+
+    def get_wire_bytes(self, **kwargs):
+        self.server.bytes_sent = 0
+        self.assertEqual(len(self.get_client(**kwargs)._get('volumes', 'volumes')), 100)
+        return self.server.bytes_sent
+
+    def test_compressed_response_is_decoded(self):
+        self.assertLess(self.get_wire_bytes(), self.get_wire_bytes(compression=False) / 2)
+
+    @unittest.skipIf(client.ijson is None, 'ijson is not installed.')
+    def test_compressed_response_is_streamed(self):
+        rijkscloud = self.get_client(streaming=True)
+        self.assertEqual(len(list(rijkscloud._iter('volumes', 'volumes'))), 100)
+
+
+class MetricsTest(BaseClientTest):
+    def setUp(self):
+        super(MetricsTest, self).setUp()
+        self.registry = metrics.MetricsRegistry()
+
+    def test_requests_are_recorded_by_endpoint_template(self):
+        rijkscloud = self.get_client(metrics=self.registry)
+        rijkscloud.list_flavors()
+        self.assertRaises(requests.HTTPError, rijkscloud.get_instance, 'first')
+        self.assertRaises(requests.HTTPError, rijkscloud.get_instance, 'second')
+
+        stats = self.registry.get_stats()
+        self.assertEqual(stats['get', 'flavors']['count'], 1)
+        self.assertGreater(stats['get', 'flavors']['bytes'], 0)
+        self.assertEqual(stats['get', 'instances/{name}']['count'], 2)
+        self.assertEqual(stats['get', 'instances/{name}']['errors'], 2)
+
+    def test_hook_is_called_after_request(self):
+        observations = []
+        self.registry.add_hook(observations.append)
+        self.get_client(metrics=self.registry).list_flavors()
+        self.assertEqual(len(observations), 1)
+        self.assertEqual(observations[0].endpoint, 'flavors')
+        self.assertEqual(observations[0].status, 200)
+
+
+class FailoverTest(BaseClientTest):
+    def setUp(self):
+        super(FailoverTest, self).setUp()
+        self.mirror = StubServer(dict(self.server.routes)).start()
+        self.addCleanup(self.mirror.stop)
+
+    def get_failover_client(self, base_urls, **kwargs):
+        kwargs.setdefault('exploration_rate', 0)
+        return client.RijkscloudClient(apikey='secret', userid='admin', base_url=base_urls, **kwargs)
+
+    def test_request_fails_over_to_mirror_if_endpoint_is_unreachable(self):
+        unreachable = StubServer()
+        base_url = unreachable.base_url
+        unreachable.server_close()
+
+        self.mirror.routes['volumes'] = {'volume': {'name': 'volume'}}
+        rijkscloud = self.get_failover_client([base_url, self.mirror.base_url])
+        # Connection which was refused is failed over even for requests which are not retried.
+        self.assertEqual(len(rijkscloud.list_flavors()), 1)
+        rijkscloud.create_volume({'name': 'volume'})
+        self.assertEqual(self.mirror.requests, 2)
+        self.assertFalse(rijkscloud.endpoints.get_state()[base_url]['healthy'])
+
+    def test_retry_is_sent_to_another_endpoint(self):
+        self.server.errors = {'flavors': [503]}
+        rijkscloud = self.get_failover_client(
+            [self.server.base_url, self.mirror.base_url],
+            retry_policy=client.RetryPolicy(retries=1, backoff_factor=0.01))
+        self.assertEqual(len(rijkscloud.list_flavors()), 1)
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.mirror.requests, 1)
+
+    def test_requests_are_routed_to_the_fastest_endpoint(self):
+        self.server.delay = 0.05
+        rijkscloud = self.get_failover_client([self.server.base_url, self.mirror.base_url])
+        for _ in range(10):
+            rijkscloud.list_flavors()
+        # Each endpoint is measured once, then the fastest one is used.
+        self.assertEqual(self.server.requests, 1)
+        self.assertEqual(self.mirror.requests, 9)
+
+    def test_comma_separated_endpoints_are_accepted(self):
+        rijkscloud = self.get_failover_client('%s, %s/' % (self.server.base_url, self.mirror.base_url))
+        self.assertEqual(rijkscloud.endpoints.base_urls, [self.server.base_url, self.mirror.base_url])
+        self.assertEqual(rijkscloud.base_url, self.server.base_url)
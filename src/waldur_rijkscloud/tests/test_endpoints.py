@@ -0,0 +1,61 @@
+from __future__ import unicode_literals
+
+import unittest
+
+from six.moves import mock
+
+from .. import endpoints
+
+
+class ParseBaseUrlsTest(unittest.TestCase):
+    def test_comma_separated_urls_are_parsed(self):
+        self.assertEqual(endpoints.parse_base_urls('https://a.example.com/, https://b.example.com'),
+                         ['https://a.example.com', 'https://b.example.com'])
+
+    def test_list_of_urls_is_accepted(self):
+        self.assertEqual(endpoints.parse_base_urls(['https://a.example.com/']), ['https://a.example.com'])
+
+
+@mock.patch('waldur_rijkscloud.endpoints.time')
+class EndpointPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = endpoints.EndpointPool(['http://a', 'http://b'], failure_cooldown=30, exploration_rate=0)
+
+    def test_endpoint_with_the_lowest_latency_is_selected(self, mocked_time):
+        mocked_time.time.return_value = 0
+        self.pool.record('http://a', latency=0.5)
+        self.pool.record('http://b', latency=0.1)
+        self.assertEqual(self.pool.select(), 'http://b')
+
+    def test_unmeasured_endpoint_is_selected_first(self, mocked_time):
+        mocked_time.time.return_value = 0
+        self.pool.record('http://a', latency=0.1)
+        self.assertEqual(self.pool.select(), 'http://b')
+
+    def test_failed_endpoint_is_avoided_until_cooldown_is_over(self, mocked_time):
+        mocked_time.time.return_value = 0
+        self.pool.record('http://a', latency=0.1)
+        self.pool.record('http://b', latency=0.5)
+        self.pool.record('http://a', success=False)
+        self.assertEqual(self.pool.select(), 'http://b')
+        self.assertFalse(self.pool.get_state()['http://a']['healthy'])
+
+        mocked_time.time.return_value = 30
+        self.assertEqual(self.pool.select(), 'http://a')
+
+    def test_earliest_failed_endpoint_is_selected_if_all_failed(self, mocked_time):
+        mocked_time.time.return_value = 0
+        self.pool.record('http://b', success=False)
+        mocked_time.time.return_value = 1
+        self.pool.record('http://a', success=False)
+        self.assertEqual(self.pool.select(), 'http://b')
+
+    def test_excluded_endpoint_is_not_selected(self, mocked_time):
+        mocked_time.time.return_value = 0
+        self.pool.record('http://a', latency=0.1)
+        self.pool.record('http://b', latency=0.5)
+        self.assertEqual(self.pool.select(exclude={'http://a'}), 'http://b')
+        self.assertEqual(self.pool.select(exclude={'http://a', 'http://b'}), 'http://a')
+
+    def test_request_url_is_split(self, mocked_time):
+        self.assertEqual(self.pool.split('http://b/instances/vm-1'), ('http://b', 'instances/vm-1'))
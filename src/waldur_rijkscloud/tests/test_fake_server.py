@@ -0,0 +1,80 @@
+from __future__ import unicode_literals
+
+import unittest
+
+import requests
+
+from .. import client
+from .fake_server import Dataset, FakeRijkscloudServer
+
+
+class DatasetTest(unittest.TestCase):
+    def setUp(self):
+        self.routes = Dataset(flavors=2, volumes=3, instances=2, networks=2, subnets=2, ips=300,
+                              floating_ips=1).get_routes()
+
+    def test_instances_refer_to_existing_resources(self):
+        flavors = {flavor['name'] for flavor in self.routes['flavors']['flavors']}
+        for item in self.routes['instances']['instances']:
+            instance = self.routes['instances/%s' % item['name']]['instance']
+            self.assertIn(instance['flavor'], flavors)
+            for volume in instance['volumes']:
+                self.assertIn('volumes/%s' % volume, self.routes)
+
+    def test_addresses_of_subnet_are_unique(self):
+        ips = [ip['ip'] for ip in self.routes['networks/net-000/subnets/subnet-000-000/ips']['ips']]
+        self.assertEqual(len(ips), 300)
+        self.assertEqual(len(set(ips)), 300)
+
+    def test_assigned_addresses_are_not_available(self):
+        self.assertFalse(self.routes['networks/floats']['floats'][0]['available'])
+        instance = self.routes['instances/vm-00000']['instance']
+        self.assertIn('145.0.0.1', instance['addresses'])
+
+
+class FakeServerTest(unittest.TestCase):
+    def setUp(self):
+        self.server = FakeRijkscloudServer(Dataset(volumes=5, instances=5)).start()
+        self.client = client.RijkscloudClient(
+            apikey='secret', userid='admin', base_url=self.server.base_url, max_workers=5)
+
+    def tearDown(self):
+        self.server.stop()
+        client.close_sessions()
+
+    def test_client_lists_generated_resources(self):
+        self.assertEqual(len(self.client.list_instances()), 5)
+        self.assertEqual(len(self.client.list_volumes()), 5)
+        subnets = list(self.client.iter_subnets(self.client.list_network_names()))
+        self.assertEqual(len(subnets), 4)
+        self.assertEqual(len(subnets[0][1]['ips']), 254)
+
+    def test_volume_is_created_and_deleted(self):
+        self.client.create_volume({'name': 'new-volume', 'size': 1, 'description': ''})
+        self.assertEqual(self.client.get_volume('new-volume')['status'], 'available')
+        self.assertEqual(len(self.client.list_volumes()), 6)
+
+        self.client.delete_volume('new-volume')
+        with self.assertRaises(requests.HTTPError):
+            self.client.get_volume('new-volume')
+        self.assertEqual(len(self.client.list_volumes()), 5)
+
+    def test_injected_errors_are_retried(self):
+        self.server.error_rate = 0.5
+        rijkscloud = client.RijkscloudClient(
+            apikey='secret', userid='admin', base_url=self.server.base_url,
+            retry_policy=client.RetryPolicy(retries=20, backoff_factor=0.001, max_backoff=0.01))
+        self.assertEqual(len(rijkscloud.list_instances()), 5)
+        self.assertGreater(self.server.failed, 0)
+
+    def test_requests_exceeding_rate_are_throttled(self):
+        self.server.stop()
+        self.server = FakeRijkscloudServer(Dataset(volumes=5, instances=5), rate=1, burst=2).start()
+        rijkscloud = client.RijkscloudClient(apikey='secret', userid='admin', base_url=self.server.base_url)
+        rijkscloud.list_flavors()
+        rijkscloud.list_flavors()
+        with self.assertRaises(requests.HTTPError) as context:
+            rijkscloud.list_flavors()
+        self.assertEqual(context.exception.response.status_code, 429)
+        self.assertEqual(context.exception.response.headers['Retry-After'], '1')
+        self.assertEqual(self.server.throttled, 1)
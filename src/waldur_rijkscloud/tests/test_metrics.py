@@ -0,0 +1,63 @@
+from __future__ import unicode_literals
+
+import time
+import unittest
+
+from .. import metrics
+
+
+class EndpointTemplateTest(unittest.TestCase):
+    def test_resource_names_are_replaced(self):
+        self.assertEqual(metrics.get_endpoint_template('instances/vm-1'), 'instances/{name}')
+        self.assertEqual(metrics.get_endpoint_template('networks/net/subnets/subnet/ips'),
+                         'networks/{name}/subnets/{name}/ips')
+
+    def test_literal_segments_are_preserved(self):
+        self.assertEqual(metrics.get_endpoint_template('networks/floats'), 'networks/floats')
+        self.assertEqual(metrics.get_endpoint_template('flavors'), 'flavors')
+
+
+class MetricsRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = metrics.MetricsRegistry(buckets=(0.1, 1))
+
+    def test_latency_histogram_is_cumulative(self):
+        for latency in (0.05, 0.5, 0.7, 5):
+            self.registry.observe('get', 'flavors', 200, latency, 10)
+        stats = self.registry.get_stats()['get', 'flavors']
+        self.assertEqual(stats['histogram'], [(0.1, 1), (1, 3), (float('inf'), 4)])
+        self.assertEqual(stats['bytes'], 40)
+
+    def test_failed_requests_are_counted_as_errors(self):
+        self.registry.observe('get', 'flavors', 503, 0.1, 0)
+        self.registry.observe('get', 'flavors', None, 0.1, 0)
+        self.registry.observe('get', 'flavors', 200, 0.1, 0)
+        self.assertEqual(self.registry.get_stats()['get', 'flavors']['errors'], 2)
+
+    def test_prometheus_export(self):
+        self.registry.observe('get', 'instances/vm-1', 200, 0.5, 100)
+        text = self.registry.export_prometheus()
+        self.assertIn('rijkscloud_api_requests_total{method="get",endpoint="instances/{name}"} 1\n', text)
+        self.assertIn('rijkscloud_api_response_bytes_total{method="get",endpoint="instances/{name}"} 100\n', text)
+        self.assertIn('rijkscloud_api_request_duration_seconds_bucket'
+                      '{method="get",endpoint="instances/{name}",le="0.1"} 0\n', text)
+        self.assertIn('rijkscloud_api_request_duration_seconds_bucket'
+                      '{method="get",endpoint="instances/{name}",le="+Inf"} 1\n', text)
+        self.assertIn('# TYPE rijkscloud_api_request_duration_seconds histogram\n', text)
+
+    def test_failed_hook_does_not_break_observation(self):
+        def hook(observation):
+            raise ValueError()
+
+        self.registry.add_hook(hook)
+        self.registry.observe('get', 'flavors', 200, 0.1, 0)
+        self.registry.remove_hook(hook)
+        self.assertEqual(self.registry.get_stats()['get', 'flavors']['count'], 1)
+
+    def test_overhead_is_bounded(self):
+        # Generous bound which holds on slow CI machines, see MetricsRegistry docstring.
+        observations = 10000
+        started = time.time()
+        for index in range(observations):
+            self.registry.observe('get', 'instances/vm-%s' % index, 200, 0.1, 100)
+        self.assertLess((time.time() - started) / observations, 100e-6)
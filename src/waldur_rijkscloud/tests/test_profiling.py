@@ -0,0 +1,106 @@
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from six.moves import mock
+
+from .. import profiling
+
+
+class Backend(object):
+    def __init__(self):
+        self.calls = 0
+
+    def sync(self):
+        self.calls += 1
+        time.sleep(0.05)
+        return 'synced'
+
+    def pull_flavors(self):
+        return self.sync()
+
+    def ping(self):
+        return True
+
+
+class ProfilingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.options = {
+            'ENABLED': True,
+            'PROFILER': 'sampling',
+            'RATE': 1,
+            'SAMPLING_INTERVAL': 0.005,
+            'METHODS': ['sync', 'pull_*'],
+            'DIRECTORY': self.directory,
+        }
+        patcher = mock.patch('waldur_rijkscloud.profiling.get_options', return_value=self.options)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def instrument(self):
+        backend = Backend()
+        profiling.instrument(backend, label='settings')
+        return backend
+
+    def test_sampling_profiler_dumps_folded_stacks(self):
+        self.assertEqual(self.instrument().sync(), 'synced')
+        files = os.listdir(self.directory)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith('sync-settings-'))
+        self.assertTrue(files[0].endswith('.folded'))
+        with open(os.path.join(self.directory, files[0])) as profile:
+            self.assertIn('sync (', profile.read())
+
+    def test_cprofile_profiler_dumps_pstats(self):
+        self.options['PROFILER'] = 'cprofile'
+        self.instrument().sync()
+        files = os.listdir(self.directory)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].endswith('.pstats'))
+
+    def test_methods_not_matching_patterns_are_not_profiled(self):
+        self.instrument().ping()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_nested_calls_are_profiled_once(self):
+        backend = self.instrument()
+        backend.pull_flavors()
+        self.assertEqual(backend.calls, 1)
+        files = os.listdir(self.directory)
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].startswith('pull_flavors-'))
+
+    def test_nothing_is_profiled_if_rate_is_zero(self):
+        self.options['RATE'] = 0
+        self.instrument().sync()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_nothing_is_profiled_if_disabled(self):
+        self.options['ENABLED'] = False
+        backend = self.instrument()
+        self.assertNotIn('sync', vars(backend))
+        backend.sync()
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class ProfilingOptionsTest(unittest.TestCase):
+    def test_environment_overrides_settings(self):
+        environ = {
+            'WALDUR_RIJKSCLOUD_PROFILER': 'cprofile',
+            'WALDUR_RIJKSCLOUD_PROFILING_RATE': '0.5',
+        }
+        with mock.patch.dict(os.environ, environ):
+            options = profiling.get_options()
+        self.assertTrue(options['ENABLED'])
+        self.assertEqual(options['PROFILER'], 'cprofile')
+        self.assertEqual(options['RATE'], 0.5)
+
+    def test_profiling_is_disabled_by_environment(self):
+        with mock.patch.dict(os.environ, {'WALDUR_RIJKSCLOUD_PROFILER': 'off'}):
+            self.assertFalse(profiling.get_options()['ENABLED'])
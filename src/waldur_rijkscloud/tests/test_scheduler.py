@@ -0,0 +1,62 @@
+from __future__ import unicode_literals
+
+import threading
+import unittest
+
+from ..scheduler import SyncScheduler
+
+
+class SyncSchedulerTest(unittest.TestCase):
+    def get_scheduler(self, max_workers, calls, failed=()):
+        def phase(name):
+            def run():
+                calls.append(name)
+                if name in failed:
+                    raise ValueError(name)
+            return run
+
+        scheduler = SyncScheduler(max_workers=max_workers)
+        scheduler.add('flavors', phase('flavors'))
+        scheduler.add('networks', phase('networks'))
+        scheduler.add('volumes', phase('volumes'))
+        scheduler.add('instances', phase('instances'), dependencies=('flavors', 'networks'))
+        return scheduler
+
+    def test_phases_are_run_sequentially_by_default(self):
+        calls = []
+        self.get_scheduler(1, calls).run()
+        self.assertEqual(calls, ['flavors', 'networks', 'volumes', 'instances'])
+
+    def test_phase_is_started_after_its_dependencies(self):
+        calls = []
+        self.get_scheduler(4, calls).run()
+        self.assertEqual(len(calls), 4)
+        self.assertGreater(calls.index('instances'), calls.index('flavors'))
+        self.assertGreater(calls.index('instances'), calls.index('networks'))
+
+    def test_independent_phases_are_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5) if hasattr(threading, 'Barrier') else None
+        if barrier is None:
+            self.skipTest('threading.Barrier is not available.')
+
+        scheduler = SyncScheduler(max_workers=2)
+        scheduler.add('flavors', barrier.wait)
+        scheduler.add('volumes', barrier.wait)
+        scheduler.run()
+
+    def test_timing_is_reported_for_each_phase(self):
+        timings = self.get_scheduler(4, []).run()
+        self.assertEqual({timing.name for timing in timings},
+                         {'flavors', 'networks', 'volumes', 'instances'})
+        self.assertTrue(all(timing.duration >= 0 for timing in timings))
+
+    def test_dependants_are_not_started_if_phase_fails(self):
+        for max_workers in (1, 4):
+            calls = []
+            scheduler = self.get_scheduler(max_workers, calls, failed=('networks',))
+            self.assertRaises(ValueError, scheduler.run)
+            self.assertNotIn('instances', calls)
+
+    def test_unknown_dependency_is_rejected(self):
+        scheduler = SyncScheduler()
+        self.assertRaises(ValueError, scheduler.add, 'instances', lambda: None, dependencies=('flavors',))
@@ -0,0 +1,31 @@
+from rest_framework import status, test
+
+from waldur_core.structure.tests import factories as structure_factories
+
+from . import factories, fixtures
+
+
+class SyncRunListTest(test.APITransactionTestCase):
+    def setUp(self):
+        super(SyncRunListTest, self).setUp()
+        self.fixture = fixtures.RijkscloudFixture()
+        self.sync_run = factories.SyncRunFactory(settings=self.fixture.service_settings)
+        self.url = factories.SyncRunFactory.get_list_url()
+
+    def test_owner_can_list_sync_runs_of_customer_settings(self):
+        self.client.force_login(self.fixture.owner)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['uuid'], self.sync_run.uuid.hex)
+
+    def test_other_user_can_not_see_sync_runs(self):
+        self.client.force_login(structure_factories.UserFactory())
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 0)
+
+    def test_sync_runs_can_not_be_created(self):
+        self.client.force_login(self.fixture.staff)
+        response = self.client.post(self.url, {})
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
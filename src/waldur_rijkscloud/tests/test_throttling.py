@@ -0,0 +1,115 @@
+from __future__ import unicode_literals
+
+import threading
+import unittest
+
+from six.moves import mock
+
+from .. import throttling
+
+
+class TokenBucketTest(unittest.TestCase):
+    @mock.patch('waldur_rijkscloud.throttling.time')
+    def test_request_waits_for_token_when_burst_is_exhausted(self, mocked_time):
+        mocked_time.time.return_value = 100
+        mocked_time.sleep.side_effect = lambda delay: setattr(
+            mocked_time.time, 'return_value', mocked_time.time.return_value + delay)
+
+        bucket = throttling.TokenBucket(rate=2, burst=2)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertEqual(bucket.acquire(), 0)
+        self.assertAlmostEqual(bucket.acquire(), 0.5)
+
+
+class AdaptiveConcurrencyLimiterTest(unittest.TestCase):
+    def test_limit_is_halved_when_api_is_overloaded(self):
+        limiter = throttling.AdaptiveConcurrencyLimiter(max_limit=8)
+        limiter.acquire()
+        limiter.release(latency=0.1, is_overloaded=True)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_limit_is_not_decreased_below_minimum(self):
+        limiter = throttling.AdaptiveConcurrencyLimiter(max_limit=8, min_limit=3)
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release(latency=0.1, is_overloaded=True)
+        self.assertEqual(limiter.limit, 3)
+
+    def test_limit_is_increased_while_api_is_healthy(self):
+        limiter = throttling.AdaptiveConcurrencyLimiter(max_limit=8)
+        limiter.acquire()
+        limiter.release(latency=0.1, is_overloaded=True)
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release(latency=0.1, is_overloaded=False)
+        self.assertGreater(limiter.limit, 4)
+        self.assertLessEqual(limiter.limit, 8)
+
+    def test_limit_is_decreased_on_latency_spike(self):
+        limiter = throttling.AdaptiveConcurrencyLimiter(max_limit=8, latency_spike_ratio=3)
+        limiter.acquire()
+        limiter.release(latency=0.1, is_overloaded=False)
+        limiter.acquire()
+        limiter.release(latency=1, is_overloaded=False)
+        self.assertEqual(limiter.limit, 4)
+
+    def test_latency_spike_is_detected_per_endpoint(self):
+        limiter = throttling.AdaptiveConcurrencyLimiter(max_limit=10)
+        for _ in range(50):
+            limiter.release(latency=0.05, is_overloaded=False, ticket=limiter.acquire(), endpoint='volumes/{name}')
+        tickets = [limiter.acquire() for _ in range(4)]
+        for ticket in tickets:
+            limiter.release(latency=0.4, is_overloaded=False, ticket=ticket, endpoint='networks/{name}/subnets')
+        self.assertEqual(limiter.limit, 10)
+
+    def test_limit_is_halved_once_per_window(self):
+        limiter = throttling.AdaptiveConcurrencyLimiter(max_limit=8)
+        tickets = [limiter.acquire() for _ in range(4)]
+        for ticket in tickets:
+            limiter.release(latency=0.1, is_overloaded=True, ticket=ticket)
+        self.assertEqual(limiter.limit, 4)
+
+        limiter.release(latency=0.1, is_overloaded=True, ticket=limiter.acquire())
+        self.assertEqual(limiter.limit, 2)
+
+    def test_requests_over_limit_wait_for_free_slot(self):
+        limiter = throttling.AdaptiveConcurrencyLimiter(max_limit=1)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        limiter.release(latency=0.1, is_overloaded=False)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+
+
+class ThrottleTest(unittest.TestCase):
+    def test_throttled_request_is_reported_in_metrics(self):
+        throttle = throttling.Throttle(max_concurrency=4)
+        with throttle.request() as outcome:
+            outcome['status'] = 429
+        with throttle.request() as outcome:
+            outcome['status'] = 200
+
+        metrics = throttle.get_metrics()
+        self.assertEqual(metrics['requests'], 2)
+        self.assertEqual(metrics['throttled_requests'], 1)
+        self.assertEqual(metrics['in_flight'], 0)
+        self.assertLess(metrics['concurrency_limit'], 4)
+
+    def test_connection_error_is_treated_as_overload(self):
+        throttle = throttling.Throttle(max_concurrency=4)
+        with self.assertRaises(IOError):
+            with throttle.request():
+                raise IOError()
+        self.assertEqual(throttle.get_metrics()['throttled_requests'], 1)
+
+    def test_throttle_is_shared_by_account(self):
+        self.assertIs(throttling.get_throttle('user@test-shared'), throttling.get_throttle('user@test-shared'))
+        self.assertIn('user@test-shared', throttling.get_metrics())
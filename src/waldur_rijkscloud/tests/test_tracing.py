@@ -0,0 +1,124 @@
+from __future__ import unicode_literals
+
+import unittest
+import uuid
+
+from six.moves import mock
+
+from .. import client, tracing
+from .stub_server import StubServer
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+except ImportError:
+    TracerProvider = None
+
+exporter = None
+
+
+def get_exporter():
+    # Tracer provider may be set only once per process.
+    global exporter
+    if exporter is None:
+        exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        trace.set_tracer_provider(provider)
+    return exporter
+
+
+class NoopTracingTest(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch('waldur_rijkscloud.tracing.trace', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_span_is_noop_if_opentelemetry_is_not_installed(self):
+        with tracing.span('operation', {'key': 'value'}) as span:
+            span.set_attribute('key', 'value')
+        self.assertIs(span, tracing.NOOP_SPAN)
+
+    def test_context_is_empty_if_opentelemetry_is_not_installed(self):
+        self.assertEqual(tracing.inject(), {})
+        func = mock.Mock()
+        self.assertIs(tracing.bind(func), func)
+
+
+@unittest.skipIf(TracerProvider is None, 'opentelemetry-sdk is not installed')
+class TracingTest(unittest.TestCase):
+    def setUp(self):
+        self.exporter = get_exporter()
+        self.exporter.clear()
+        self.server = StubServer({
+            'instances': {'instances': [{'name': 'vm-1'}, {'name': 'vm-2'}]},
+            'instances/vm-1': {'instance': {'name': 'vm-1'}},
+            'instances/vm-2': {'instance': {'name': 'vm-2'}},
+        }).start()
+
+    def tearDown(self):
+        self.server.stop()
+        client.close_sessions()
+
+    def get_client(self, **kwargs):
+        return client.RijkscloudClient(
+            'apikey', 'userid', base_url=self.server.base_url,
+            trace_attributes={'waldur.settings.uuid': 'settings'}, **kwargs)
+
+    def get_spans(self):
+        return {span.name: span for span in self.exporter.get_finished_spans()}
+
+    def test_request_span_has_endpoint_and_status_attributes(self):
+        self.get_client().get_instance('vm-1')
+        span = self.get_spans()['Rijkscloud GET instances/{name}']
+        self.assertEqual(span.attributes['rijkscloud.endpoint'], 'instances/{name}')
+        self.assertEqual(span.attributes['http.status_code'], 200)
+        self.assertEqual(span.attributes['waldur.settings.uuid'], 'settings')
+
+    def test_concurrent_requests_belong_to_trace_of_caller(self):
+        with tracing.span('sync') as parent:
+            self.get_client(max_workers=2).list_instances()
+        trace_id = parent.get_span_context().trace_id
+        spans = self.exporter.get_finished_spans()
+        self.assertEqual(len(spans), 4)
+        self.assertTrue(all(span.context.trace_id == trace_id for span in spans))
+
+    def test_request_is_not_traced_without_attributes(self):
+        client.RijkscloudClient('apikey', 'userid', base_url=self.server.base_url).get_instance('vm-1')
+        self.assertEqual(self.exporter.get_finished_spans(), ())
+
+    def test_trace_context_is_passed_through_carrier(self):
+        with tracing.span('executor') as parent:
+            carrier = tracing.inject()
+
+        def task():
+            with tracing.span('task'):
+                pass
+
+        tracing.attached(carrier, task)
+        task = self.get_spans()['task']
+        self.assertEqual(task.parent.span_id, parent.get_span_context().span_id)
+        self.assertEqual(task.context.trace_id, parent.get_span_context().trace_id)
+
+    def test_backend_methods_are_instrumented(self):
+        class Backend(object):
+            def pull_volume(self, volume):
+                return volume
+
+            def get_volumes(self):
+                pass
+
+        backend = Backend()
+        volume = mock.Mock(uuid=uuid.uuid4())
+        options = {'ENABLED': True, 'METHODS': ['pull_*']}
+        with mock.patch('waldur_rijkscloud.tracing.django_settings') as settings:
+            settings.WALDUR_RIJKSCLOUD = {'TRACING': options}
+            tracing.instrument(backend, {'waldur.settings.uuid': 'settings'})
+        self.assertEqual(backend.pull_volume(volume), volume)
+        backend.get_volumes()
+
+        spans = self.get_spans()
+        self.assertEqual(list(spans), ['Backend.pull_volume'])
+        self.assertEqual(spans['Backend.pull_volume'].attributes['waldur.resource.uuid'], volume.uuid.hex)
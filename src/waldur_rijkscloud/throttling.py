@@ -0,0 +1,174 @@
+from __future__ import unicode_literals
+
+import contextlib
+import threading
+import time
+
+
+class TokenBucket(object):
+    """
+    Allow up to rate requests per second on average and bursts of up to burst requests.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Take one token, blocking until it is available. Return number of seconds waited.
+        """
+        waited = 0
+        while True:
+            with self._lock:
+                now = time.time()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class AdaptiveConcurrencyLimiter(object):
+    """
+    Limit number of concurrent requests adjusting the limit using AIMD:
+    limit grows by one per limit of successful requests and it is halved
+    when API throttles requests, fails with server error or latency spikes.
+
+    Latency baseline is kept per endpoint, as list responses are routinely
+    slower than detail ones. Limit is halved at most once per window: requests
+    acquired before the last decrease do not decrease it again.
+    """
+
+    def __init__(self, max_limit, min_limit=1, latency_spike_ratio=3, latency_smoothing=0.2):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.latency_spike_ratio = latency_spike_ratio
+        self.latency_smoothing = latency_smoothing
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        # Average latency of all requests, it is reported in metrics.
+        self.latency = None
+        self.latencies = {}
+        self.decreases = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Wait for a free slot and return ticket which is passed to release.
+        """
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return self.decreases
+
+    def release(self, latency, is_overloaded, ticket=None, endpoint=None):
+        """
+        :param ticket: value returned by acquire, if it is None, limit may be decreased regardless of window.
+        :param endpoint: key of latency baseline, such as endpoint template.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            baseline = self.latencies.get(endpoint)
+            is_spike = (baseline is not None and self.latency_spike_ratio and
+                        latency > baseline * self.latency_spike_ratio)
+            if is_overloaded or is_spike:
+                if ticket is None or ticket == self.decreases:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self.decreases += 1
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+            if baseline is None:
+                self.latencies[endpoint] = latency
+            elif not is_spike:
+                self.latencies[endpoint] = baseline + (latency - baseline) * self.latency_smoothing
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += (latency - self.latency) * self.latency_smoothing
+            self._condition.notify_all()
+
+
+class Throttle(object):
+    """
+    Client-side rate limiter and adaptive concurrency controller for one API account.
+    """
+
+    def __init__(self, rate=0, burst=1, max_concurrency=10, min_concurrency=1, latency_spike_ratio=3):
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.limiter = AdaptiveConcurrencyLimiter(max_concurrency, min_concurrency, latency_spike_ratio)
+        self.requests = 0
+        self.throttled = 0
+        self.waited = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def is_overloaded(status_code):
+        return status_code == 429 or status_code >= 500
+
+    @contextlib.contextmanager
+    def request(self, endpoint=None):
+        """
+        Wait for a free slot and report outcome of the request made within the context.
+        Context yields dict where caller puts response status code as 'status'.
+
+        :param endpoint: endpoint template of the request, latency spikes are detected per endpoint.
+        """
+        waited = self.bucket.acquire() if self.bucket else 0
+        ticket = self.limiter.acquire()
+        outcome = {'status': None}
+        started = time.time()
+        is_overloaded = True
+        try:
+            yield outcome
+            is_overloaded = outcome['status'] is not None and self.is_overloaded(outcome['status'])
+        finally:
+            self.limiter.release(time.time() - started, is_overloaded, ticket, endpoint)
+            with self._lock:
+                self.requests += 1
+                self.waited += waited
+                if is_overloaded:
+                    self.throttled += 1
+
+    def get_metrics(self):
+        return {
+            'rate_limit': self.bucket.rate if self.bucket else 0,
+            'concurrency_limit': int(self.limiter.limit),
+            'in_flight': self.limiter.in_flight,
+            'latency': self.limiter.latency or 0,
+            'requests': self.requests,
+            'throttled_requests': self.throttled,
+            'rate_limit_wait': self.waited,
+        }
+
+
+_throttles = {}
+_throttles_lock = threading.Lock()
+
+
+def get_throttle(key, **options):
+    """
+    Return throttle shared by all threads of the process for the given API account.
+    """
+    with _throttles_lock:
+        throttle = _throttles.get(key)
+        if throttle is None:
+            throttle = _throttles[key] = Throttle(**options)
+        return throttle
+
+
+def get_metrics():
+    """
+    Return current limits and observed latency of all API accounts used by the process.
+    """
+    with _throttles_lock:
+        throttles = list(_throttles.items())
+    return {key: throttle.get_metrics() for key, throttle in throttles}
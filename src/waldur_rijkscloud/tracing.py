@@ -0,0 +1,187 @@
+from __future__ import unicode_literals
+
+import fnmatch
+import functools
+import logging
+
+from django.conf import settings as django_settings
+
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import propagate
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+TRACER_NAME = 'waldur_rijkscloud'
+
+# Name of Celery task keyword argument which carries trace context of executor.
+TRACE_CONTEXT_KWARG = 'trace_context'
+
+
+class NoopSpan(object):
+    """
+    Span used if opentelemetry package is not installed or tracing is disabled.
+    """
+
+    def set_attribute(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NOOP_SPAN = NoopSpan()
+
+
+def is_enabled():
+    return trace is not None and django_settings.WALDUR_RIJKSCLOUD['TRACING']['ENABLED']
+
+
+def span(name, attributes=None):
+    """
+    Return context manager of span which is a child of the current one.
+    Spans are dropped by OpenTelemetry API unless tracer provider is configured.
+    """
+    if trace is None:
+        return NOOP_SPAN
+    attributes = {key: value for key, value in (attributes or {}).items() if value is not None}
+    return trace.get_tracer(TRACER_NAME).start_as_current_span(name, attributes=attributes)
+
+
+def set_attributes(attributes):
+    """
+    Add attributes to the current span.
+    """
+    if trace is None:
+        return
+    current = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            current.set_attribute(key, value)
+
+
+def inject(carrier=None):
+    """
+    Write trace context of the current span to carrier dict, such as HTTP headers
+    or keyword arguments of Celery task, and return it.
+    """
+    carrier = {} if carrier is None else carrier
+    if trace is not None:
+        propagate.inject(carrier)
+    return carrier
+
+
+def bind(func):
+    """
+    Bind func to the current trace context, so that spans created by func
+    in a worker thread belong to the trace of the caller.
+    """
+    if trace is None:
+        return func
+    current = otel_context.get_current()
+
+    @functools.wraps(func)
+    def wrapped(*args, **kwargs):
+        token = otel_context.attach(current)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            otel_context.detach(token)
+
+    return wrapped
+
+
+def attached(carrier, func, *args, **kwargs):
+    """
+    Call func within trace context extracted from carrier written by inject.
+    """
+    if trace is None or not carrier:
+        return func(*args, **kwargs)
+    token = otel_context.attach(propagate.extract(carrier))
+    try:
+        return func(*args, **kwargs)
+    finally:
+        otel_context.detach(token)
+
+
+def get_resource_attributes(resource):
+    """
+    Return span attributes of resource or service property.
+    """
+    attributes = {'waldur.resource.uuid': getattr(getattr(resource, 'uuid', None), 'hex', None)}
+    service_project_link = getattr(resource, 'service_project_link', None)
+    if service_project_link is not None:
+        attributes['waldur.settings.uuid'] = service_project_link.service.settings.uuid.hex
+    elif getattr(resource, 'settings', None) is not None:
+        attributes['waldur.settings.uuid'] = resource.settings.uuid.hex
+    return attributes
+
+
+def get_executor_context(executor, resource):
+    """
+    Record span of executor scheduling Celery tasks and return its trace context,
+    which is passed to the tasks, so that all tasks of chain belong to the same trace.
+    """
+    if not is_enabled():
+        return {}
+    with span('executor %s' % executor.__name__, get_resource_attributes(resource)):
+        return inject()
+
+
+def trace_method(func, name, attributes):
+    @functools.wraps(func)
+    def wrapped(*args, **kwargs):
+        span_attributes = dict(attributes)
+        if args and hasattr(args[0], 'uuid'):
+            span_attributes['waldur.resource.uuid'] = getattr(args[0].uuid, 'hex', None)
+        with span(name, span_attributes):
+            return func(*args, **kwargs)
+
+    return wrapped
+
+
+def instrument(obj, attributes):
+    """
+    Replace methods of obj matching TRACING['METHODS'] patterns with ones which
+    record span with given attributes and UUID of resource passed as the first argument.
+    """
+    if not is_enabled():
+        return
+
+    patterns = django_settings.WALDUR_RIJKSCLOUD['TRACING']['METHODS']
+    for name in dir(obj):
+        if name.startswith('_') or not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+            continue
+        method = getattr(obj, name)
+        if callable(method):
+            setattr(obj, name, trace_method(method, '%s.%s' % (obj.__class__.__name__, name), attributes))
+
+
+def configure_exporter():
+    """
+    Export spans to OTLP collector if EXPORTER_ENDPOINT is set, otherwise spans
+    are dropped unless tracer provider is configured by the host application.
+    """
+    options = django_settings.WALDUR_RIJKSCLOUD['TRACING']
+    if not options['ENABLED'] or not options['EXPORTER_ENDPOINT'] or trace is None:
+        return
+
+    try:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning('Rijkscloud traces are not exported because opentelemetry-sdk '
+                       'or opentelemetry-exporter-otlp-proto-http package is not installed.')
+        return
+
+    provider = TracerProvider(resource=Resource.create({'service.name': options['SERVICE_NAME']}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=options['EXPORTER_ENDPOINT'])))
+    trace.set_tracer_provider(provider)
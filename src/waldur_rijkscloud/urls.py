@@ -12,3 +12,4 @@ def register_in(router):
     router.register(r'rijkscloud-subnets', views.SubNetViewSet, base_name='rijkscloud-subnet')
     router.register(r'rijkscloud-internal-ips', views.InternalIPViewSet, base_name='rijkscloud-internal-ip')
     router.register(r'rijkscloud-floating-ips', views.FloatingIPViewSet, base_name='rijkscloud-fip')
+    router.register(r'rijkscloud-sync-runs', views.SyncRunViewSet, base_name='rijkscloud-sync-run')
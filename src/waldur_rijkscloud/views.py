@@ -1,6 +1,9 @@
 from __future__ import unicode_literals
 
-from waldur_core.structure import views as structure_views
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import viewsets
+
+from waldur_core.structure import filters as structure_filters, views as structure_views
 
 from . import filters, executors, models, serializers
 
@@ -77,3 +80,11 @@ class FloatingIPViewSet(structure_views.BaseServicePropertyViewSet):
     serializer_class = serializers.FloatingIPSerializer
     lookup_field = 'uuid'
     filter_class = filters.FloatingIPFilter
+
+
+class SyncRunViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = models.SyncRun.objects.all().order_by('-started')
+    serializer_class = serializers.SyncRunSerializer
+    lookup_field = 'uuid'
+    filter_backends = (structure_filters.GenericRoleFilter, DjangoFilterBackend)
+    filter_class = filters.SyncRunFilter